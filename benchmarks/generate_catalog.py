@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Generate a synthetic Apps/ tree for benchmarking the repository scripts."""
+import argparse
+import json
+import os
+import random
+from typing import Tuple
+from PIL import Image
+import yaml
+
+RULES_TEMPLATE = {
+    'preferred_extensions': ['.tipa', '.ipa'],
+    'excluded_extensions': ['.zip', '.tar.gz', '.deb'],
+    'exclude_patterns': ['debug'],
+    'strip_v_prefix': True,
+    'replace_chars': {'-': '.', '_': '.'},
+    'remove_chars': ['-beta', '-alpha', '-dev']
+}
+CATEGORIES = ['utilities', 'games', 'entertainment', 'developer', 'social']
+
+def repo_url(index: int) -> str:
+    return f"https://github.com/bench/app{index:05d}"
+
+def generate_catalog(root: str, apps: int = 1000, versions: int = 10, screenshots: int = 2,
+                     screenshot_size: Tuple[int, int] = (300, 650), icons: bool = True, seed: int = 0):
+    """Write repo-info.json and an Apps/ tree with the given shape under root."""
+    rng = random.Random(seed)
+    apps_dir = os.path.join(root, 'Apps')
+    os.makedirs(apps_dir, exist_ok=True)
+    with open(os.path.join(root, 'repo-info.json'), 'w') as f:
+        json.dump({
+            'name': 'Benchmark',
+            'subtitle': 'Synthetic catalog',
+            'description': 'Generated for benchmarking',
+            'iconURL': '',
+            'headerURL': '',
+            'website': '',
+            'tintColor': '#000000'
+        }, f, indent=2)
+
+    for i in range(apps):
+        name = f"App{i:05d}"
+        app_dir = os.path.join(apps_dir, name)
+        os.makedirs(app_dir, exist_ok=True)
+        config = {
+            'gitURLs': [repo_url(i)],
+            'name': name,
+            'bundleID': f"dev.bench.{name.lower()}",
+            'devName': 'Bench',
+            'subtitle': f"Synthetic app {i}",
+            'description': ' '.join(rng.choice(['fast', 'tiny', 'iOS', 'tweak', 'tool', 'app']) for _ in range(40)),
+            'category': rng.choice(CATEGORIES),
+            'icon': '',
+            'screenshots': [],
+            'versions': [{
+                'version': f"1.{versions - v}.0",
+                'date': f"2024-{12 - v % 12:02d}-{28 - v % 28:02d}",
+                'size': rng.randint(1_000_000, 80_000_000),
+                'url': f"{repo_url(i)}/releases/download/v1.{versions - v}.0/{name}.ipa"
+            } for v in range(versions)]
+        }
+        with open(os.path.join(app_dir, 'app.json'), 'w') as f:
+            json.dump(config, f, indent=4)
+        with open(os.path.join(app_dir, '.rules.yaml'), 'w') as f:
+            yaml.dump(RULES_TEMPLATE, f, default_flow_style=False)
+
+        if icons:
+            Image.effect_noise((512, 512), 64).convert('RGB').save(os.path.join(app_dir, 'icon.jpg'), 'JPEG')
+        if screenshots:
+            shots_dir = os.path.join(app_dir, 'screenshots')
+            os.makedirs(shots_dir, exist_ok=True)
+            for n in range(screenshots):
+                # Noise compresses poorly, so encoding cost resembles real screenshots
+                Image.effect_noise(screenshot_size, 32).convert('RGB').save(
+                    os.path.join(shots_dir, f"shot_{n}.jpg"), 'JPEG', quality=90)
+
+def parse_size(value: str) -> Tuple[int, int]:
+    try:
+        width, height = (int(part) for part in value.lower().split('x'))
+        return width, height
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"Invalid size: {value}. Expected WIDTHxHEIGHT.") from e
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Apps/ tree")
+    parser.add_argument("root", help="Directory to create the catalog in")
+    parser.add_argument("--apps", type=int, default=1000, help="Number of apps")
+    parser.add_argument("--versions", type=int, default=10, help="Existing versions per app")
+    parser.add_argument("--screenshots", type=int, default=2, help="Screenshots per app")
+    parser.add_argument("--screenshot-size", type=parse_size, default=(300, 650), help="Screenshot size as WxH")
+    parser.add_argument("--no-icons", action="store_true", help="Do not generate icons")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+    generate_catalog(args.root, args.apps, args.versions, args.screenshots, args.screenshot_size,
+                     not args.no_icons, args.seed)
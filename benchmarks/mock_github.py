@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Local stand-in for the GitHub releases REST and GraphQL APIs."""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+class MockGitHub:
+    """Serves deterministic releases for any owner/repo with paging, ETags, latency and rate limits."""
+
+    def __init__(self, releases_per_repo: int = 50, latency: float = 0.0, rate_limit: int = 5000,
+                 window: int = 3600, port: int = 0):
+        self.releases_per_repo = releases_per_repo
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window = window
+        self.stats = {'requests': 0, 'not_modified': 0, 'rate_limited': 0, 'graphql': 0}
+        self._remaining = rate_limit
+        self._reset = time.time() + window
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> 'MockGitHub':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def releases(self, owner: str, repo: str) -> List[Dict]:
+        """Releases for a repo, newest first, in the REST API shape."""
+        releases = []
+        for n in range(self.releases_per_repo, 0, -1):
+            tag = f"v1.{n}.0"
+            day = time.gmtime(1704067200 + n * 86400)
+            base = f"https://github.com/{owner}/{repo}/releases/download/{tag}"
+            releases.append({
+                'id': n,
+                'tag_name': tag,
+                'published_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', day),
+                'assets': [
+                    {'name': f"{repo}.ipa", 'size': 1_000_000 + n, 'browser_download_url': f"{base}/{repo}.ipa"},
+                    {'name': f"{repo}.tipa", 'size': 1_000_500 + n, 'browser_download_url': f"{base}/{repo}.tipa"},
+                    {'name': f"{repo}-src.zip", 'size': 50_000 + n, 'browser_download_url': f"{base}/{repo}-src.zip"}
+                ]
+            })
+        return releases
+
+    def _consume(self) -> Optional[Dict]:
+        """Spend one unit of budget; returns rate-limit headers, or None once exhausted."""
+        with self._lock:
+            self.stats['requests'] += 1
+            now = time.time()
+            if now >= self._reset:
+                self._remaining, self._reset = self.rate_limit, now + self.window
+            if self._remaining <= 0:
+                self.stats['rate_limited'] += 1
+                return None
+            self._remaining -= 1
+            return self._headers()
+
+    def _headers(self) -> Dict:
+        return {
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Remaining': str(self._remaining),
+            'X-RateLimit-Reset': str(int(self._reset))
+        }
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b'', headers: Optional[Dict] = None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if mock.latency:
+                    time.sleep(mock.latency)
+                parsed = urlparse(self.path)
+                match = re.fullmatch(r'/repos/([^/]+)/([^/]+)/releases', parsed.path)
+                if not match:
+                    return self._send(404, b'{"message": "Not Found"}')
+                query = parse_qs(parsed.query)
+                per_page = min(100, int(query.get('per_page', ['30'])[0]))
+                page = int(query.get('page', ['1'])[0])
+                releases = mock.releases(*match.groups())
+                body = json.dumps(releases[(page - 1) * per_page:page * per_page]).encode('utf-8')
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+                if self.headers.get('If-None-Match') == etag:
+                    # Conditional hits are free, like on GitHub
+                    with mock._lock:
+                        mock.stats['requests'] += 1
+                        mock.stats['not_modified'] += 1
+                        headers = mock._headers()
+                    return self._send(304, headers={**headers, 'ETag': etag})
+
+                headers = mock._consume()
+                if headers is None:
+                    with mock._lock:
+                        headers = mock._headers()
+                    return self._send(403, b'{"message": "API rate limit exceeded"}', headers)
+                headers['ETag'] = etag
+                if page * per_page < len(releases):
+                    next_url = f"{mock.url}{parsed.path}?per_page={per_page}&page={page + 1}"
+                    headers['Link'] = f'<{next_url}>; rel="next"'
+                self._send(200, body, headers)
+
+            def do_POST(self):
+                if mock.latency:
+                    time.sleep(mock.latency)
+                if urlparse(self.path).path != '/graphql':
+                    return self._send(404, b'{"message": "Not Found"}')
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                headers = mock._consume()
+                if headers is None:
+                    with mock._lock:
+                        headers = mock._headers()
+                    return self._send(403, b'{"message": "API rate limit exceeded"}', headers)
+                with mock._lock:
+                    mock.stats['graphql'] += 1
+
+                page_size = int(re.search(r'releases\(first: (\d+)', payload['query']).group(1))
+                variables, data, i = payload.get('variables', {}), {}, 0
+                while f"o{i}" in variables:
+                    offset = int(variables.get(f"c{i}") or 0)
+                    releases = mock.releases(variables[f"o{i}"], variables[f"n{i}"])
+                    data[f"r{i}"] = {'releases': {
+                        'pageInfo': {'hasNextPage': offset + page_size < len(releases),
+                                     'endCursor': str(offset + page_size)},
+                        'nodes': [{
+                            'databaseId': r['id'],
+                            'tagName': r['tag_name'],
+                            'publishedAt': r['published_at'],
+                            'releaseAssets': {'nodes': [{'name': a['name'], 'size': a['size'],
+                                                         'downloadUrl': a['browser_download_url']}
+                                                        for a in r['assets']]}
+                        } for r in releases[offset:offset + page_size]]
+                    }}
+                    i += 1
+                self._send(200, json.dumps({'data': data}).encode('utf-8'), headers)
+
+        return Handler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a mock GitHub releases API")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--releases", type=int, default=50, help="Releases per repository")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of latency added to each request")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="Requests allowed per window")
+    parser.add_argument("--window", type=int, default=3600, help="Rate-limit window in seconds")
+    args = parser.parse_args()
+    server = MockGitHub(args.releases, args.latency, args.rate_limit, args.window, args.port).start()
+    print(f"Mock GitHub API listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Time and measure memory of the repository scripts against a synthetic catalog and mock API."""
+import argparse
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'scripts'))
+
+from generate_catalog import generate_catalog, parse_size
+from mock_github import MockGitHub
+
+def measure(func: Callable, traced: bool) -> Dict:
+    """Run func once for its wall time, or under tracemalloc for its peak Python allocation.
+
+    Tracing slows code down several times over, and unevenly, so the two are never taken from the same run.
+    """
+    if not traced:
+        start = time.perf_counter()
+        func()
+        return {'seconds': round(time.perf_counter() - start, 4)}
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'peak_bytes': peak}
+
+def children_max_rss() -> Optional[int]:
+    """Largest resident set of any reaped child process so far, in bytes."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def bench_compile(root: str, traced: bool) -> Dict:
+    from compile_repository import RepoCompiler
+    compiler = RepoCompiler(root, output_dir=os.path.join(root, 'out'), cache_dir=os.path.join(root, '.cache', 'compile'))
+    compiler.logger.setLevel(logging.WARNING)
+    return {
+        'cold': measure(lambda: compiler.compile_repos(), traced),
+        'warm': measure(lambda: compiler.compile_repos(), traced)
+    }
+
+def bench_versions(root: str, mock: MockGitHub, workers: int, backend: str, traced: bool) -> Dict:
+    from manage_versions import VersionManager
+
+    def run():
+        # A fresh manager per run so the warm run only benefits from on-disk caches
+        manager = VersionManager(os.path.join(root, 'Apps'), workers=workers, api_url=mock.url,
+                                 cache_dir=os.path.join(root, '.cache', 'http'), tokens=['bench'], backend=backend)
+        for name in ("VersionManager", "RequestScheduler", "GraphQLScheduler", "GraphQLReleaseBackend"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+        manager.manage('update')
+
+    results = {}
+    for phase in ('cold', 'warm'):
+        before = dict(mock.stats)
+        results[phase] = measure(run, traced)
+        results[phase]['requests'] = {k: mock.stats[k] - before[k] for k in mock.stats}
+    return results
+
+def bench_assets(root: str, workers: int, traced: bool) -> Dict:
+    from manage_assets import AssetManager
+    manager = AssetManager(os.path.join(root, 'Apps'), workers=workers)
+    manager.logger.setLevel(logging.WARNING)
+    results = {}
+    for phase in ('cold', 'warm'):
+        before = children_max_rss()
+        results[phase] = measure(lambda: manager.manage_icons(), traced)
+        if traced:
+            # tracemalloc only sees this process; pool workers are covered by their peak RSS instead.
+            # RUSAGE_CHILDREN keeps a high-water mark over every reaped child, so a phase that stayed
+            # below an earlier one (or ran serially) reports None rather than someone else's peak.
+            after = children_max_rss()
+            results[phase]['worker_peak_rss_bytes'] = after if before is not None and after > before else None
+    return results
+
+def run_suite(root: str, mock: MockGitHub, selected, args, traced: bool) -> Dict:
+    # Same order as the nightly jobs: versions, then assets, then compile
+    results = {}
+    if 'versions' in selected:
+        results['versions'] = bench_versions(root, mock, args.workers, args.backend, traced)
+    if 'assets' in selected:
+        results['assets'] = bench_assets(root, args.workers, traced)
+    if 'compile' in selected:
+        results['compile'] = bench_compile(root, traced)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the repository scripts on a synthetic catalog")
+    parser.add_argument("--apps", type=int, default=1000, help="Number of synthetic apps")
+    parser.add_argument("--versions", type=int, default=10, help="Existing versions per app")
+    parser.add_argument("--releases", type=int, default=50, help="Releases per mock repository")
+    parser.add_argument("--screenshots", type=int, default=2, help="Screenshots per app")
+    parser.add_argument("--screenshot-size", type=parse_size, default=(300, 650), help="Screenshot size as WxH")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock API latency per request in seconds")
+    parser.add_argument("--rate-limit", type=int, default=100000, help="Mock API requests per window")
+    parser.add_argument("--workers", type=int, default=8, help="Worker count for versions and assets")
+    parser.add_argument("--backend", choices=["rest", "graphql"], default="rest", help="Release discovery backend")
+    parser.add_argument("--only", type=str, default="compile,versions,assets",
+                        help="Comma-separated benchmarks to run")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic catalog directory")
+    parser.add_argument("--out", type=str, help="Write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    os.environ.pop("GITHUB_TOKENS", None)
+    selected = [name.strip() for name in args.only.split(',') if name.strip()]
+    base = tempfile.mkdtemp(prefix='drksrc-bench-')
+    mock = MockGitHub(args.releases, args.latency, args.rate_limit).start()
+    try:
+        catalog = os.path.join(base, 'catalog')
+        generate_start = time.perf_counter()
+        generate_catalog(catalog, args.apps, args.versions, args.screenshots, args.screenshot_size)
+        results = {'generate': {'seconds': round(time.perf_counter() - generate_start, 4)}}
+        # Memory and timing come from separate passes, each over its own copy of the same catalog.
+        # Memory goes first so the asset workers it measures are the first children this process reaps.
+        passes = {}
+        for name, traced in (('memory', True), ('timing', False)):
+            root = os.path.join(base, name)
+            shutil.copytree(catalog, root)
+            passes[name] = run_suite(root, mock, selected, args, traced)
+        for bench, phases in passes['timing'].items():
+            results[bench] = {phase: {**passes['memory'][bench][phase], **timed} for phase, timed in phases.items()}
+    finally:
+        mock.stop()
+        if not args.keep:
+            shutil.rmtree(base, ignore_errors=True)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'params': {k: v for k, v in vars(args).items() if k not in ('out', 'keep')},
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
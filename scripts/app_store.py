@@ -0,0 +1,135 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Optional, Set
+from metrics import METRICS
+
+_MISSING = object()
+
+class AppStore:
+    """Shared, transactional access to app.json and its sidecar files.
+
+    Each file is parsed once per store and handed out as a shared working document.
+    Saves only touch disk when fields changed, merge those fields onto whatever is on
+    disk if another process rewrote the file meanwhile, and land via write-then-rename.
+    """
+
+    def __init__(self, indent: int = 4):
+        self.indent = indent
+        self.logger = logging.getLogger("AppStore")
+        self._documents: Dict[str, Dict] = {}
+        self._snapshots: Dict[str, Dict] = {}
+        self._digests: Dict[str, str] = {}
+        self._written: Set[str] = set()
+        self._lock = threading.RLock()
+
+    def __getstate__(self) -> Dict:
+        # Worker processes start with an empty cache of their own
+        return {'indent': self.indent}
+
+    def __setstate__(self, state: Dict):
+        self.__init__(**state)
+
+    def load(self, path: str) -> Dict:
+        """Return the working document for a JSON file, reading it from disk on first use.
+
+        Raises FileNotFoundError, PermissionError or json.JSONDecodeError like json.load would.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            if key not in self._documents:
+                with open(key, 'rb') as f:
+                    raw = f.read()
+                data = json.loads(raw.decode('utf-8'))
+                self._documents[key] = data
+                self._snapshots[key] = copy.deepcopy(data)
+                self._digests[key] = hashlib.sha256(raw).hexdigest()
+            return self._documents[key]
+
+    def digest(self, path: str) -> Optional[str]:
+        """SHA-256 of the file's bytes as last read or written through this store."""
+        return self._digests.get(os.path.abspath(path))
+
+    def dirty_fields(self, path: str, data: Dict) -> Set[str]:
+        """Top-level keys of data that differ from what is on disk."""
+        snapshot = self._snapshots.get(os.path.abspath(path), {})
+        return {k for k in set(snapshot) | set(data) if snapshot.get(k, _MISSING) != data.get(k, _MISSING)}
+
+    def save(self, path: str, data: Dict) -> bool:
+        """Persist data atomically if anything changed; returns False only on a failed write."""
+        key = os.path.abspath(path)
+        with self._lock:
+            tracked = key in self._snapshots
+            dirty = self.dirty_fields(key, data) if tracked else set(data)
+            if tracked and not dirty:
+                self.logger.debug(f"No changes to {path}, skipped writing")
+                return True
+
+            merged = data
+            on_disk = self._read_if_changed(key) if tracked else None
+            if on_disk is not None:
+                # Someone else rewrote the file since we read it: keep their fields, apply only ours
+                self.logger.info(f"{path} changed on disk, merging fields {sorted(dirty)}")
+                merged = {**on_disk}
+                for field in dirty:
+                    if field in data:
+                        merged[field] = data[field]
+                    else:
+                        merged.pop(field, None)
+
+            raw = json.dumps(merged, indent=self.indent).encode('utf-8')
+            tmp_path = None
+            try:
+                directory = os.path.dirname(key)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(raw)
+                os.replace(tmp_path, key)
+            except (IOError, PermissionError) as e:
+                self.logger.error(f"Failed to save config {path}: {str(e)}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return False
+
+            METRICS.incr('configs_written')
+            METRICS.incr('bytes_written', len(raw))
+            if merged is not data:
+                data.clear()
+                data.update(merged)
+            self._documents[key] = data
+            self._snapshots[key] = copy.deepcopy(data)
+            self._digests[key] = hashlib.sha256(raw).hexdigest()
+            self._written.add(key)
+            return True
+
+    def take_written(self) -> Set[str]:
+        """Absolute paths of the files written since the last call."""
+        with self._lock:
+            written, self._written = self._written, set()
+        return written
+
+    def delete(self, path: str):
+        """Remove a file and forget any cached state for it."""
+        key = os.path.abspath(path)
+        with self._lock:
+            for cache in (self._documents, self._snapshots, self._digests):
+                cache.pop(key, None)
+            if os.path.exists(key):
+                os.remove(key)
+
+    def _read_if_changed(self, key: str) -> Optional[Dict]:
+        try:
+            with open(key, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        if hashlib.sha256(raw).hexdigest() == self._digests.get(key):
+            return None
+        try:
+            return json.loads(raw.decode('utf-8'))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
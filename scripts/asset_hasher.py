@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+from requests.exceptions import RequestException
+from metrics import METRICS
+from request_scheduler import RequestScheduler
+from url_cache import URLCache
+
+class AssetHasher:
+    """Streams release assets through SHA-256 without holding them in memory, caching digests by URL and size."""
+
+    def __init__(self, scheduler: RequestScheduler, cache: URLCache, workers: int = 4,
+                 chunk_size: int = 1024 * 1024, timeout: int = 60):
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("workers must be a positive integer")
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+        self.scheduler = scheduler
+        self.cache = cache
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.logger = logging.getLogger("AssetHasher")
+
+    def hash_many(self, assets: Iterable[Tuple[str, Optional[int]]]) -> Dict[str, Dict]:
+        """Return {'sha256', 'size'} per URL for (url, size) pairs; failures map to {'error': ...}."""
+        results, pending = {}, []
+        for url, size in dict.fromkeys(assets):
+            cached = self.cache.get(URLCache.key(url, size))
+            if cached is not None:
+                METRICS.incr('digest_cache_hits')
+                results[url] = cached
+            else:
+                pending.append((url, size))
+
+        self.logger.info(f"Hashing {len(pending)} assets ({len(results)} cached)")
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for (url, size), result in zip(pending, pool.map(lambda item: self._hash_cached(*item), pending)):
+                results[url] = result
+        self.cache.save()
+        return results
+
+    def _hash_cached(self, url: str, size: Optional[int]) -> Dict:
+        try:
+            result = self.hash(url)
+        except RequestException as e:
+            return {'error': str(e)}
+        # Keyed by the size actually downloaded, so a corrected size in app.json still hits
+        self.cache.put(URLCache.key(url, result['size']), result)
+        return result
+
+    def hash(self, url: str) -> Dict:
+        """Download an asset once, hashing it chunk by chunk."""
+        digest, size = hashlib.sha256(), 0
+        with self.scheduler.request('GET', url, timeout=self.timeout, allow_redirects=True, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                digest.update(chunk)
+                size += len(chunk)
+        METRICS.incr('assets_hashed')
+        METRICS.incr('http_bytes', size)
+        return {'sha256': digest.hexdigest(), 'size': size}
@@ -0,0 +1,45 @@
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+from app_store import AppStore
+
+class CatalogEntry:
+    def __init__(self, name: str, app_dir: str):
+        self.name = name
+        self.dir = app_dir
+        self.config_path = os.path.join(app_dir, 'app.json')
+        self.rules_path = os.path.join(app_dir, '.rules.yaml')
+
+class Catalog:
+    """Index of the Apps/ tree, listed once per process and shared by every target of a run."""
+
+    def __init__(self, apps_root: str, store: Optional[AppStore] = None):
+        self.apps_root = apps_root
+        self.store = store or AppStore()
+        self.logger = logging.getLogger("Catalog")
+        self.entries: Dict[str, CatalogEntry] = {}
+        with os.scandir(apps_root) as it:
+            for item in sorted(it, key=lambda e: e.name):
+                if item.is_dir() and os.path.isfile(os.path.join(item.path, 'app.json')):
+                    self.entries[item.name] = CatalogEntry(item.name, item.path)
+
+    def select(self, targets: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+        """(app, config_path) pairs for the named apps, or for every app when no targets are given."""
+        if not targets:
+            return [(name, entry.config_path) for name, entry in self.entries.items()]
+        selected = []
+        for name in dict.fromkeys(targets):
+            if name in self.entries:
+                selected.append((name, self.entries[name].config_path))
+            else:
+                self.logger.warning(f"No app named {name} in {self.apps_root}")
+        return selected
+
+    def repos(self, name: str) -> List[str]:
+        """The app's gitURLs as a list, or an empty list if its config can't be read."""
+        try:
+            git_urls = self.store.load(self.entries[name].config_path).get('gitURLs') or []
+        except (FileNotFoundError, json.JSONDecodeError, PermissionError):
+            return []
+        return [git_urls] if isinstance(git_urls, str) else list(git_urls)
@@ -1,21 +1,30 @@
 #!/usr/bin/env python3
 import argparse
-from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timezone
+import hashlib
 import json
 import logging
 from pathlib import Path
+import os
 import random
 import sys
-from typing import Dict, List, Optional, Tuple
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from app_store import AppStore
+import feed_formats
+import feed_writer
+from feed_formats import FORMATS, FeedFormat
+from feed_writer import FeedWriter
+from metrics import METRICS, run_instrumented
 
 CONFIG = {
     "NO_ICON_PATH": "https://raw.githubusercontent.com/DRKCTRLDEV/DRKSRC/main/static/assets/DRKSRC (No-Icon).png",
-    "OUTPUT_FILES": {
-        "altstore": "altstore.json",
-        "trollapps": "trollapps.json",
-        "scarlet": "scarlet.json"
-    }
+    "INDEX_FILE": "index.json",
+    "SHARDS_DIR": "shards",
+    # Older versions trimmed from tiered feeds, one file per app
+    "HISTORY_DIR": "history",
+    "RAW_BASE_URL": "https://raw.githubusercontent.com/DRKCTRLDEV/DRKSRC/main"
 }
 
 def configure_logging(verbose: bool = False) -> logging.Logger:
@@ -26,35 +35,62 @@ def configure_logging(verbose: bool = False) -> logging.Logger:
     )
     return logging.getLogger(__name__)
 
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
 class RepoCompiler:
-    def __init__(self, root_dir: str = '.', featured_count: int = 5, output_dir: str = '.'):
+    def __init__(self, root_dir: str = '.', featured_count: int = 5, output_dir: str = '.',
+                 cache_dir: Optional[str] = None, force: bool = False,
+                 minify: bool = False, compress: bool = False, index: bool = False,
+                 store: Optional[AppStore] = None, tier_versions: Optional[int] = None,
+                 size_report: Optional[str] = None):
+        if tier_versions is not None and (not isinstance(tier_versions, int) or tier_versions < 1):
+            raise ValueError("tier_versions must be a positive integer")
         self.root_dir = Path(root_dir).resolve()
         self.apps_dir = self.root_dir / 'Apps'
         self.output_dir = Path(output_dir).resolve()
         self.featured_count = featured_count
+        self.manifest_path = Path(cache_dir or self.root_dir / '.cache' / 'compile').resolve() / 'manifest.json'
+        # Rendered entries, one file per format and app; the manifest only keeps their digests
+        self.entries_dir = self.manifest_path.parent / 'entries'
+        self.force = force
+        self.index = index
+        self.tier_versions = tier_versions
+        self.size_report = size_report
         self.logger = configure_logging()
+        self.store = store or AppStore()
+        self.writer = FeedWriter(minify=minify, compress=compress, logger=self.logger)
+        self._entry_cache: Dict[str, Dict] = {}
+        self._used_entries: Dict[str, Dict] = {}
+        self._reused_entries = 0
+        self._render_seconds = 0.0
 
     def load_config(self, path: Path) -> Optional[Dict]:
+        return self._load_hashed(path)[0]
+
+    def _load_hashed(self, path: Path) -> Tuple[Optional[Dict], Optional[str]]:
+        """Parse a JSON file and return it with the SHA-256 of its raw bytes."""
         try:
-            return json.loads(path.read_text(encoding='utf-8'))
-        except (FileNotFoundError, json.JSONDecodeError, PermissionError) as e:
+            # A shallow copy: the compiler annotates configs it must never write back
+            return dict(self.store.load(str(path))), self.store.digest(str(path))
+        except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError, PermissionError) as e:
             self.logger.error(f"Failed to load {path}: {e}")
-            return None
+            return None, None
 
     def save_config(self, path: Path, data: Dict, dry_run: bool = False) -> bool:
+        """Stream a feed to disk with its optional minified/compressed variants."""
         if dry_run:
             self.logger.info(f"Dry run: Would save to {path}")
             return True
         try:
-            path.parent.mkdir(parents=True, exist_ok=True)
-            path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding='utf-8')
-            self.logger.info(f"Saved to {path}")
+            sizes = self.writer.write(path, data)
+            self.logger.info("Sizes: " + ", ".join(f"{name} {size:,} bytes" for name, size in sizes.items()))
             return True
         except Exception as e:
             self.logger.error(f"Failed to save {path}: {e}")
             return False
 
-    def _load_app_data(self, target_fmt: str) -> Tuple[List[Dict], List[str]]:
+    def _load_app_data(self) -> Tuple[List[Dict], List[str]]:
         if not self.apps_dir.exists():
             self.logger.error(f"Apps directory not found: {self.apps_dir}")
             return [], []
@@ -65,11 +101,13 @@ class RepoCompiler:
                 self.logger.debug(f"Skipping non-directory: {app_dir}")
                 continue
 
-            app_config = self.load_config(app_dir / 'app.json')
+            app_config, digest = self._load_hashed(app_dir / 'app.json')
             if not app_config or not (bid := app_config.get("bundleID")):
                 self.logger.warning(f"Skipping invalid app config in {app_dir}")
                 continue
             app_config.setdefault("name", "Unnamed App")
+            # Never emitted by the formatters; identifies the app for the render cache
+            app_config['_source'] = {'dir': app_dir.name, 'sha256': digest}
             apps.append(app_config)
             bundle_ids.append(bid)
             self.logger.info(f"Loaded app: {app_config['name']} ({bid})")
@@ -78,167 +116,351 @@ class RepoCompiler:
             self.logger.warning("No valid apps found")
             return apps, []
 
-        current_week = datetime.now().isocalendar().week
         # Seed random with year and week to ensure featured apps are consistent within a week but change weekly
-        random.seed(f"{datetime.now().year}-{current_week}")
+        random.seed(self._featured_seed())
         featured = random.sample(bundle_ids, min(self.featured_count, len(bundle_ids)))
         random.seed()
 
         self.logger.info(f"Loaded {len(apps)} apps")
         return apps, featured
 
-    def compile_repos(self, target_fmt: Optional[str] = None, verbose: bool = False) -> Dict:
-        self.logger.info(f"Compiling for: {target_fmt or 'all'}")
-        repo_config = self.load_config(self.root_dir / 'repo-info.json')
+    def _featured_seed(self) -> str:
+        return f"{datetime.now().year}-{datetime.now().isocalendar().week}"
+
+    def _load_manifest(self) -> Dict:
+        # Options that change rendered entries are part of the renderer identity
+        renderer = sha256_hex(b"".join(Path(module).read_bytes()
+                                       for module in (__file__, feed_formats.__file__, feed_writer.__file__))
+                              + f"tier={self.tier_versions}".encode('utf-8'))
+        manifest = None if self.force else self._read_manifest()
+        # Cached entries are only valid for the exact renderer that produced them
+        if not manifest or manifest.get('renderer') != renderer:
+            manifest = {'renderer': renderer, 'entries': {}, 'outputs': {}}
+        return manifest
+
+    def _read_manifest(self) -> Optional[Dict]:
+        try:
+            return json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, PermissionError) as e:
+            self.logger.warning(f"Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return None
+
+    def _save_manifest(self, manifest: Dict):
+        tmp_path = None
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.manifest_path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+        except (IOError, PermissionError) as e:
+            self.logger.error(f"Failed to save manifest {self.manifest_path}: {e}")
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _inputs_digest(self, repo_digest: str, apps: List[Dict]) -> str:
+        parts = [repo_digest, self._featured_seed()] + [f"{a['_source']['dir']}:{a['_source']['sha256']}" for a in apps]
+        return sha256_hex("\n".join(parts).encode('utf-8'))
+
+    def _output_current(self, path: Path, record: Optional[Dict], inputs: str) -> bool:
+        if not record or record.get('inputs') != inputs:
+            return False
+        if not all(p.is_file() for p in self.writer.variant_paths(path)):
+            return False
+        return sha256_hex(path.read_bytes()) == record.get('sha256')
+
+    def compile_repos(self, target_fmt: Optional[Union[str, List[str]]] = None, verbose: bool = False) -> Dict:
+        """Compile one, several or all formats from a single load of the catalog."""
+        target_fmts = [target_fmt] if isinstance(target_fmt, str) else target_fmt
+        self.logger.info(f"Compiling for: {', '.join(target_fmts) if target_fmts else 'all'}")
+        load_start = time.perf_counter()
+        repo_config, repo_digest = self._load_hashed(self.root_dir / 'repo-info.json')
         if not repo_config:
             return {'success': False, 'error': 'Missing/invalid repo config'}
 
-        apps, featured = self._load_app_data(target_fmt)
+        apps, featured = self._load_app_data()
         if not apps:
             return {'success': False, 'error': 'No valid apps found'}
+        records = [self._build_record(app) for app in apps]
+        timings = {'load': time.perf_counter() - load_start}
+        METRICS.record('load', timings['load'])
+        manifest = self._load_manifest()
+        inputs = self._inputs_digest(repo_digest, apps)
 
-        formats = {
-            'altstore': (self.output_dir / CONFIG["OUTPUT_FILES"]["altstore"], self._format_altstore),
-            'trollapps': (self.output_dir / CONFIG["OUTPUT_FILES"]["trollapps"], self._format_trollapps),
-            'scarlet': (self.output_dir / CONFIG["OUTPUT_FILES"]["scarlet"], self._format_scarlet)
-        }
+        formats = {name: (self.output_dir / feed_format.output_file, feed_format)
+                   for name, feed_format in FORMATS.items()}
+
+        # Handle selected formats
+        if target_fmts:
+            target_fmts = list(dict.fromkeys(fmt.lower() for fmt in target_fmts))
+            invalid = [fmt for fmt in target_fmts if fmt not in formats]
+            if invalid:
+                return {'success': False, 'error': f'Invalid format: {", ".join(invalid)}'}
+            formats = {fmt: formats[fmt] for fmt in target_fmts}
 
-        # Handle single format
-        if target_fmt:
-            target_fmt = target_fmt.lower()
-            if target_fmt not in formats:
-                return {'success': False, 'error': f'Invalid format: {target_fmt}'}
-            formats = {target_fmt: formats[target_fmt]}
+        # Compile each selected format from the same in-memory catalog
+        for fmt, (path, feed_format) in formats.items():
+            if (self._output_current(path, manifest['outputs'].get(fmt), inputs)
+                    and self._entries_present(fmt, manifest['entries'].get(fmt, {}))):
+                timings[fmt] = {'render': 0.0, 'write': 0.0}
+                self.logger.info(f"{fmt} format is up to date, skipping")
+                continue
 
-        # Compile each selected format
-        for fmt, (path, formatter) in formats.items():
             self.logger.info(f"Compiling {fmt} format...")
             try:
-                repo_data = formatter(repo_config, apps, featured) if fmt != 'scarlet' else formatter(repo_config, apps)
+                render_start = time.perf_counter()
+                self._entry_cache = manifest['entries'].get(fmt, {})
+                self._used_entries, self._reused_entries, self._render_seconds = {}, 0, 0.0
+                repo_data = feed_format.feed(repo_config, records, featured,
+                                             lambda record, f=feed_format: self._cached_entry(record, f))
+                write_start = time.perf_counter()
                 if not self.save_config(path, repo_data):
                     return {'success': False, 'error': f'Failed to save {path.name}'}
-                self.logger.info(f"Successfully compiled {fmt} format")
+                # Entries are rendered lazily while the writer streams them, so their time is moved from write to render
+                timings[fmt] = {'render': write_start - render_start + self._render_seconds,
+                                'write': time.perf_counter() - write_start - self._render_seconds}
+                for stage, seconds in timings[fmt].items():
+                    METRICS.record(f"{fmt}.{stage}", seconds)
+                METRICS.incr('entries_reused', self._reused_entries)
+                manifest['entries'][fmt] = self._used_entries
+                self._prune_entries(fmt)
+                manifest['outputs'][fmt] = {'inputs': inputs, 'sha256': sha256_hex(path.read_bytes())}
+                self.logger.info(f"Successfully compiled {fmt} format, reused {self._reused_entries}/{len(apps)} entries")
             except Exception as e:
                 self.logger.error(f"Error compiling {fmt} format: {str(e)}")
                 return {'success': False, 'error': f'Error compiling {fmt} format: {str(e)}'}
 
-        self.logger.info("Compilation completed")
-        return {'success': True}
+        self._save_manifest(manifest)
+        if self.tier_versions:
+            with METRICS.timer('history'):
+                self._write_history(records)
+        if self.size_report:
+            self._write_size_report({fmt: manifest['entries'].get(fmt, {}) for fmt in formats})
+        if self.index:
+            with METRICS.timer('index'):
+                self._write_index(repo_config, apps, {fmt: manifest['entries'].get(fmt, {}) for fmt in formats})
 
-    def _format_altstore(self, repo_config: Dict, apps: List[Dict], featured: List[str]) -> Dict:
-        return {
-            "name": repo_config.get("name", "Unnamed Repository"),
-            "subtitle": repo_config.get("subtitle", ""),
-            "description": repo_config.get("description", ""),
-            "iconURL": repo_config.get("iconURL", ""),
-            "headerURL": repo_config.get("headerURL", ""),
-            "website": repo_config.get("website", ""),
-            "tintColor": repo_config.get("tintColor", ""),
-            "featuredApps": featured,
-            "apps": [self._create_entry(app, 'altstore') for app in apps],
-        }
+        self.logger.info(f"Loaded {len(apps)} apps in {timings['load'] * 1000:.1f}ms")
+        for fmt in formats:
+            self.logger.info(f"{fmt}: rendered in {timings[fmt]['render'] * 1000:.1f}ms, "
+                             f"written in {timings[fmt]['write'] * 1000:.1f}ms")
+        self.logger.info("Compilation completed")
+        return {'success': True, 'timings': timings}
 
-    def _format_trollapps(self, repo_config: Dict, apps: List[Dict], featured: List[str]) -> Dict:
-        return {
-            "name": repo_config.get("name", "Unnamed Repository"),
-            "subtitle": repo_config.get("subtitle", ""),
-            "description": repo_config.get("description", ""),
-            "iconURL": repo_config.get("iconURL", ""),
-            "headerURL": repo_config.get("headerURL", ""),
-            "website": repo_config.get("website", ""),
-            "tintColor": repo_config.get("tintColor", ""),
-            "featuredApps": featured,
-            "apps": [self._create_entry(app, 'trollapps') for app in apps],
-            "news": []  # Added empty news array
-        }
+    def _write_index(self, repo_config: Dict, apps: List[Dict], entries: Dict[str, Dict]):
+        """Write per-app shard files and an index of their hashes for cheap client revalidation."""
+        index_path = self.output_dir / CONFIG["INDEX_FILE"]
+        previous = {}
+        if index_path.is_file() and (old_index := self.load_config(index_path)):
+            previous = {app['app']: app for app in old_index.get('apps', [])}
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
 
-    def _format_scarlet(self, repo_config: Dict, apps: List[Dict]) -> Dict:
-        categories = defaultdict(list)
+        index_apps = []
         for app in apps:
-            category = app.get("category", "Other")
-            categories[category].append(self._create_entry(app, 'scarlet'))
+            app_dir = app['_source']['dir']
+            shards = dict(previous.get(app_dir, {}).get('shards', {}))
+            for fmt, fmt_entries in entries.items():
+                if app_dir not in fmt_entries:
+                    continue
+                rel_path = f"{CONFIG['SHARDS_DIR']}/{fmt}/{app_dir}.json"
+                # Shards are the rendered entries as cached, byte for byte
+                content = self._entry_path(fmt, app_dir).read_bytes()
+                digest = fmt_entries[app_dir]['entry_sha256']
+                old = shards.get(fmt, {})
+                # lastModified only moves when the shard content actually changes
+                modified = old.get('lastModified', today) if old.get('sha256') == digest else today
+                self._write_if_changed(self.output_dir / rel_path, content)
+                shards[fmt] = {'path': rel_path, 'sha256': digest, 'lastModified': modified}
+            index_apps.append({
+                'bundleID': app.get('bundleID'),
+                'app': app_dir,
+                'lastModified': max((shard['lastModified'] for shard in shards.values()), default=today),
+                'shards': shards
+            })
 
-        return {
-            "META": {
-                "repoName": repo_config.get("name", "Unnamed Repository"),
-                "repoIcon": repo_config.get("iconURL", ""),
-            },
-            **categories
-        }
+        # Drop shards of apps that no longer exist
+        current = {f"{app['_source']['dir']}.json" for app in apps}
+        for fmt in entries:
+            shard_dir = self.output_dir / CONFIG['SHARDS_DIR'] / fmt
+            if shard_dir.is_dir():
+                for stale in (p for p in shard_dir.iterdir() if p.name not in current):
+                    stale.unlink()
+                    self.logger.info(f"Removed stale shard {stale}")
+
+        index = {'name': repo_config.get("name", "Unnamed Repository"), 'apps': index_apps}
+        content = json.dumps(index, indent=2, ensure_ascii=False).encode('utf-8')
+        if self._write_if_changed(index_path, content):
+            self.logger.info(f"Saved index of {len(index_apps)} apps to {index_path}")
+        else:
+            self.logger.info(f"Unchanged, skipped writing {index_path}")
+
+    def _history_path(self, app_dir: str) -> str:
+        return f"{CONFIG['HISTORY_DIR']}/{app_dir}.json"
 
-    def _create_entry(self, app: Dict, fmt: str) -> Dict:
-        icon = app.get('icon')
-        if not icon:
-            icon = CONFIG["NO_ICON_PATH"]
-
-        if fmt == 'scarlet':
-            versions = app.get('versions', [{}])
-            version_data = versions[0] if versions else {}
-            entry = {
-                'name': app.get('name', 'Unnamed App'),
-                'version': version_data.get('version', 'Unknown'),
-                'down': version_data.get('url', ''),
-                'category': app.get('category', 'Other'),
-                'description': app.get('description', ''),
-                'bundleID': app.get('bundleID', 'Unknown'),
-                'icon': icon
+    def _write_history(self, records: List[Dict]):
+        """Write the versions trimmed from tiered feeds to per-app files that clients load on demand."""
+        history_dir = self.output_dir / CONFIG['HISTORY_DIR']
+        current = set()
+        for record in records:
+            if not record['older']:
+                continue
+            rel_path = self._history_path(record['source']['dir'])
+            history = {
+                'bundleIdentifier': record['bundleID'],
+                'versions': [FORMATS['altstore'].version(v) for v in record['older']]
             }
-            if app.get('scarletDebs'):
-                entry['debs'] = app['scarletDebs']
-            if app.get('devName'):
-                entry['dev'] = app['devName']
-            if app.get('screenshots'):
-                entry['screenshots'] = app['screenshots'][:4]  # Limit to 4 screenshots
-            if 'scarletBackup' in app:
-                entry['enableBackup'] = app['scarletBackup']
-            return entry
-
-        entry = {
-            'name': app.get('name', 'Unnamed App'),
-            'bundleIdentifier': app.get('bundleID', 'Unknown'),
-            'developerName': app.get('devName', 'Unknown Developer'),
-            'subtitle': app.get('subtitle', ''),
-            'localizedDescription': app.get('description', ''),
-            'iconURL': icon,
-        }
-        if fmt != 'trollapps':  # Only include category for non-TrollApps formats
-            entry['category'] = app.get('category', 'Other')
-        entry['versions'] = [self._format_version(v, fmt) for v in app.get('versions', [])]
-        if fmt == 'altstore':
-            entry['screenshots'] = app.get('screenshots', [])[:4]  # Limit to 4 screenshots
-        elif fmt == 'trollapps':
-            entry['screenshotURLs'] = app.get('screenshots', [])[:4]  # Limit to 4 screenshots
-            entry['appPermissions'] = {}  # Added empty appPermissions object
+            self._write_if_changed(self.output_dir / rel_path,
+                                   json.dumps(history, indent=2, ensure_ascii=False).encode('utf-8'))
+            current.add(Path(rel_path).name)
+        if history_dir.is_dir():
+            for stale in (p for p in history_dir.iterdir() if p.name not in current):
+                stale.unlink()
+                self.logger.info(f"Removed stale history {stale}")
+        self.logger.info(f"Wrote version history for {len(current)} apps to {history_dir}")
+
+    def _write_size_report(self, entries: Dict[str, Dict]):
+        """Report the serialized bytes each app contributes to each feed, largest first."""
+        report = {}
+        for fmt, fmt_entries in entries.items():
+            sizes = {app_dir: cached['size'] for app_dir, cached in fmt_entries.items()}
+            sizes = dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+            report[fmt] = {'total': sum(sizes.values()), 'apps': sizes}
+            top = ", ".join(f"{app_dir} {size:,}" for app_dir, size in list(sizes.items())[:5])
+            self.logger.info(f"{fmt}: {report[fmt]['total']:,} bytes of app entries, largest: {top}")
+        history_dir = self.output_dir / CONFIG['HISTORY_DIR']
+        if self.tier_versions and history_dir.is_dir():
+            report['history'] = {p.stem: p.stat().st_size for p in sorted(history_dir.iterdir())}
+        try:
+            path = Path(self.size_report)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+            self.logger.info(f"Saved size report to {path}")
+        except (IOError, PermissionError) as e:
+            self.logger.error(f"Failed to save size report {self.size_report}: {e}")
+
+    def _write_if_changed(self, path: Path, content: bytes) -> bool:
+        if path.is_file() and path.read_bytes() == content:
+            return False
+        self._write_atomic(path, content)
+        METRICS.incr('bytes_written', len(content))
+        return True
+
+    def _write_atomic(self, path: Path, content: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _entry_path(self, fmt: str, app_dir: str) -> Path:
+        return self.entries_dir / fmt / f"{app_dir}.json"
+
+    def _entries_present(self, fmt: str, fmt_entries: Dict) -> bool:
+        return all(self._entry_path(fmt, app_dir).is_file() for app_dir in fmt_entries)
+
+    def _cached_entry(self, record: Dict, feed_format: FeedFormat) -> Dict:
+        """Reuse the entry rendered on a previous run if the app's config is unchanged.
+
+        Entries are kept on disk rather than in the manifest, so only the one being streamed is held in memory.
+        """
+        start = time.perf_counter()
+        source = record['source']
+        path = self._entry_path(feed_format.name, source['dir'])
+        cached = self._entry_cache.get(source['dir'])
+        entry = self._read_entry(path, cached) if cached and cached['sha256'] == source['sha256'] else None
+        if entry is None:
+            entry = feed_format.entry(record)
+            content = json.dumps(entry, indent=2, ensure_ascii=False).encode('utf-8')
+            self._write_atomic(path, content)
+            cached = {'sha256': source['sha256'], 'entry_sha256': sha256_hex(content), 'size': len(content)}
+        else:
+            self._reused_entries += 1
+        self._used_entries[source['dir']] = cached
+        self._render_seconds += time.perf_counter() - start
         return entry
 
-    def _format_version(self, version: Dict, fmt: str) -> Dict:
-        version_entry = {
-            "version": version.get("version", "Unknown"),
-            "date": version.get("date", ""),
-            "downloadURL": version.get("url", ""),
-            "size": version.get("size", 0)
+    def _read_entry(self, path: Path, cached: Dict) -> Optional[Dict]:
+        try:
+            content = path.read_bytes()
+        except OSError:
+            return None
+        # A missing, partial or foreign file is simply rendered again
+        if sha256_hex(content) != cached.get('entry_sha256'):
+            return None
+        return json.loads(content)
+
+    def _prune_entries(self, fmt: str):
+        fmt_dir = self.entries_dir / fmt
+        current = {f"{app_dir}.json" for app_dir in self._used_entries}
+        for stale in (p for p in fmt_dir.iterdir() if p.name not in current):
+            stale.unlink()
+
+    def _build_record(self, app: Dict) -> Dict:
+        """Normalize an app config once into the record every feed format projects from."""
+        versions = [{
+            'version': v.get('version', 'Unknown'),
+            'date': v.get('date', ''),
+            'url': v.get('url', ''),
+            'size': v.get('size', 0),
+            'minOSVersion': (v.get('ipa') or {}).get('minOSVersion'),
+            'sha256': v.get('sha256')
+        } for v in app.get('versions') or []]
+        tier = self.tier_versions
+        return {
+            'source': app['_source'],
+            'name': app['name'],
+            'bundleID': app['bundleID'],
+            'devName': app.get('devName'),
+            'subtitle': app.get('subtitle', ''),
+            'description': app.get('description', ''),
+            'category': app.get('category', 'Other'),
+            'icons': {int(size): url for size, url in (app.get('icons') or {}).items() if url},
+            'icon': app.get('icon') or CONFIG["NO_ICON_PATH"],
+            'screenshots': (app.get('screenshots') or [])[:4],  # Limit to 4 screenshots
+            'versions': versions[:tier],
+            'older': versions[tier:] if tier else [],
+            'historyURL': f"{CONFIG['RAW_BASE_URL']}/{self._history_path(app['_source']['dir'])}"
+                          if tier and len(versions) > tier else None,
+            # Format-specific keys passed through untouched
+            'extras': {key: app[key] for key in ('scarletDebs', 'scarletBackup') if key in app}
         }
-        return version_entry
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument('-f', '--format', type=str, choices=['altstore', 'trollapps', 'scarlet'], 
+    parser.add_argument('-f', '--format', type=str, choices=list(FORMATS),
                        action='append', help='Format to compile (can be specified multiple times)')
     parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose output')
+    parser.add_argument('--force', action='store_true', help='Ignore the manifest and re-render every entry')
+    parser.add_argument('--minify', action='store_true', help='Also write minified .min.json variants')
+    parser.add_argument('--compress', action='store_true', help='Also write precompressed .gz/.br variants')
+    parser.add_argument('--index', action='store_true', help='Also write per-app shards and an index.json of their hashes')
+    parser.add_argument('--tier', type=int, help='Keep only the latest N versions per app in the feeds, '
+                                                 'moving older ones to per-app history files')
+    parser.add_argument('--size-report', type=str, help='Write a JSON report of bytes per app and format')
+    parser.add_argument('--metrics-out', type=str, help='Write a JSON metrics report to this path')
+    parser.add_argument('--profile', type=str, help='Run under cProfile and dump stats to this path')
     args = parser.parse_args()
 
-    compiler = RepoCompiler()
+    compiler = RepoCompiler(force=args.force, minify=args.minify, compress=args.compress, index=args.index,
+                            tier_versions=args.tier, size_report=args.size_report)
     # If no formats specified, compile all formats
     if not args.format:
-        args.format = ['altstore', 'trollapps', 'scarlet']
+        args.format = list(FORMATS)
     
-    # Compile each specified format
-    for fmt in args.format:
-        result = compiler.compile_repos(fmt, args.verbose)
-        if not result['success']:
-            logger = configure_logging(args.verbose)
-            logger.error(f"Compilation Failed for {fmt}: {result['error']}")
-            sys.exit(1)
+    # Compile every specified format in a single pass over the catalog
+    result = run_instrumented('compile_repository', lambda: compiler.compile_repos(args.format, args.verbose),
+                              args.metrics_out, args.profile)
+    if not result['success']:
+        logger = configure_logging(args.verbose)
+        logger.error(f"Compilation Failed for {', '.join(args.format)}: {result['error']}")
+        sys.exit(1)
     
     logger = configure_logging(args.verbose)
     logger.info("Compilation Completed")
\ No newline at end of file
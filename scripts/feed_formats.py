@@ -0,0 +1,157 @@
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Formats by name; compile_repository renders whichever are registered here
+FORMATS: Dict[str, 'FeedFormat'] = {}
+
+def register_format(cls):
+    """Class decorator adding a FeedFormat to the registry under its name."""
+    FORMATS[cls.name] = cls()
+    return cls
+
+def pick_icon(record: Dict, wanted: int) -> str:
+    """Pick the smallest generated icon at least as large as wanted, else the largest, else the fallback."""
+    icons = record['icons']
+    if icons:
+        larger = [size for size in icons if size >= wanted]
+        return icons[min(larger)] if larger else icons[max(icons)]
+    return record['icon']
+
+class FeedFormat(ABC):
+    """Projects normalized app records (see RepoCompiler._build_record) into one feed format.
+
+    Subclasses set name, output_file and icon_size and implement entry() and feed().
+    """
+
+    name = ''
+    output_file = ''
+    icon_size = 128
+
+    @abstractmethod
+    def entry(self, record: Dict) -> Dict:
+        """One app's entry in this format."""
+
+    @abstractmethod
+    def feed(self, repo_config: Dict, records: List[Dict], featured: List[str],
+             entry: Callable[[Dict], Dict]) -> Dict:
+        """Top-level document; entry(record) returns the (possibly cached) rendered entry for an app."""
+
+    def version(self, version: Dict) -> Dict:
+        version_entry = {
+            "version": version["version"],
+            "date": version["date"],
+            "downloadURL": version["url"],
+            "size": version["size"]
+        }
+        if version["minOSVersion"]:
+            version_entry["minOSVersion"] = version["minOSVersion"]
+        if version["sha256"]:
+            version_entry["sha256"] = version["sha256"]
+        return version_entry
+
+    def _repo_header(self, repo_config: Dict, featured: List[str]) -> Dict:
+        return {
+            "name": repo_config.get("name", "Unnamed Repository"),
+            "subtitle": repo_config.get("subtitle", ""),
+            "description": repo_config.get("description", ""),
+            "iconURL": repo_config.get("iconURL", ""),
+            "headerURL": repo_config.get("headerURL", ""),
+            "website": repo_config.get("website", ""),
+            "tintColor": repo_config.get("tintColor", ""),
+            "featuredApps": featured
+        }
+
+    def _common_entry(self, record: Dict) -> Dict:
+        return {
+            'name': record['name'],
+            'bundleIdentifier': record['bundleID'] or 'Unknown',
+            'developerName': record['devName'] or 'Unknown Developer',
+            'subtitle': record['subtitle'],
+            'localizedDescription': record['description'],
+            'iconURL': pick_icon(record, self.icon_size),
+        }
+
+    def _versions(self, entry: Dict, record: Dict):
+        entry['versions'] = [self.version(v) for v in record['versions']]
+        if record['historyURL']:
+            # Not part of the AltStore schema; clients that don't know it just see the latest versions
+            entry['versionHistoryURL'] = record['historyURL']
+
+@register_format
+class AltStoreFormat(FeedFormat):
+    name = 'altstore'
+    output_file = 'altstore.json'
+    icon_size = 256
+
+    def entry(self, record: Dict) -> Dict:
+        entry = self._common_entry(record)
+        entry['category'] = record['category']
+        self._versions(entry, record)
+        entry['screenshots'] = record['screenshots']
+        return entry
+
+    def feed(self, repo_config: Dict, records: List[Dict], featured: List[str],
+             entry: Callable[[Dict], Dict]) -> Dict:
+        return {**self._repo_header(repo_config, featured), "apps": (entry(r) for r in records)}
+
+@register_format
+class TrollAppsFormat(FeedFormat):
+    name = 'trollapps'
+    output_file = 'trollapps.json'
+
+    def entry(self, record: Dict) -> Dict:
+        entry = self._common_entry(record)
+        self._versions(entry, record)
+        entry['screenshotURLs'] = record['screenshots']
+        entry['appPermissions'] = {}
+        return entry
+
+    def feed(self, repo_config: Dict, records: List[Dict], featured: List[str],
+             entry: Callable[[Dict], Dict]) -> Dict:
+        return {**self._repo_header(repo_config, featured), "apps": (entry(r) for r in records), "news": []}
+
+@register_format
+class ScarletFormat(FeedFormat):
+    name = 'scarlet'
+    output_file = 'scarlet.json'
+
+    def entry(self, record: Dict) -> Dict:
+        latest: Optional[Dict] = record['versions'][0] if record['versions'] else None
+        entry = {
+            'name': record['name'],
+            'version': latest['version'] if latest else 'Unknown',
+            'down': latest['url'] if latest else '',
+            'category': record['category'],
+            'description': record['description'],
+            'bundleID': record['bundleID'] or 'Unknown',
+            'icon': pick_icon(record, self.icon_size)
+        }
+        extras = record['extras']
+        if extras.get('scarletDebs'):
+            entry['debs'] = extras['scarletDebs']
+        if record['devName']:
+            entry['dev'] = record['devName']
+        if record['screenshots']:
+            entry['screenshots'] = record['screenshots']
+        if 'scarletBackup' in extras:
+            entry['enableBackup'] = extras['scarletBackup']
+        return entry
+
+    def feed(self, repo_config: Dict, records: List[Dict], featured: List[str],
+             entry: Callable[[Dict], Dict]) -> Dict:
+        # Scarlet groups apps by category and has no featured list
+        categories = defaultdict(list)
+        for record in records:
+            categories[record['category']].append(record)
+
+        return {
+            "META": {
+                "repoName": repo_config.get("name", "Unnamed Repository"),
+                "repoIcon": repo_config.get("iconURL", ""),
+            },
+            **{category: self._entries(members, entry) for category, members in categories.items()}
+        }
+
+    def _entries(self, members: List[Dict], entry: Callable[[Dict], Dict]) -> Iterator[Dict]:
+        return (entry(record) for record in members)
@@ -0,0 +1,147 @@
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+from typing import Dict, Iterator, List, Optional
+from metrics import METRICS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+class _BrotliFile:
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.compressor = brotli.Compressor()
+
+    def write(self, data: bytes):
+        self.fileobj.write(self.compressor.process(data))
+
+    def close(self):
+        self.fileobj.write(self.compressor.finish())
+
+class _Sink:
+    def __init__(self, path: Path, pretty: bool, codec: Optional[str]):
+        self.path = path
+        self.pretty = pretty
+        self.codec = codec
+        fd, self.tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        self.raw = os.fdopen(fd, 'wb')
+        if codec == 'gzip':
+            # mtime=0 keeps the archive byte-identical across runs with the same content
+            self.stream = gzip.GzipFile(filename='', mode='wb', fileobj=self.raw, compresslevel=9, mtime=0)
+        elif codec == 'br':
+            self.stream = _BrotliFile(self.raw)
+        else:
+            self.stream = self.raw
+
+    def close(self):
+        if self.stream is not self.raw:
+            self.stream.close()
+        self.raw.close()
+
+class FeedWriter:
+    """Streams feed documents to disk, serializing iterator values one item at a time.
+
+    Produces the same bytes as json.dumps(indent=2, ensure_ascii=False) for the pretty
+    variant, and optionally minified and gzip/brotli-compressed siblings in the same pass.
+    """
+
+    def __init__(self, minify: bool = False, compress: bool = False, logger: Optional[logging.Logger] = None):
+        self.minify = minify
+        self.compress = compress
+        self.logger = logger or logging.getLogger(__name__)
+        if compress and brotli is None:
+            self.logger.warning("brotli is not installed, only .gz variants will be written")
+
+    def variant_paths(self, path: Path) -> List[Path]:
+        """Paths of every file write() produces for a feed, primary output first."""
+        return [sink[0] for sink in self._variants(path)]
+
+    def write(self, path: Path, data: Dict) -> Dict[str, int]:
+        """Write all variants of a feed and return the byte size of each, keyed by file name."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sinks: List[_Sink] = []
+        try:
+            for variant in self._variants(path):
+                sinks.append(_Sink(*variant))
+            try:
+                self._emit(sinks, data, 0)
+            finally:
+                for sink in sinks:
+                    sink.close()
+
+            sizes = {}
+            for sink in sinks:
+                sizes[sink.path.name] = os.path.getsize(sink.tmp_path)
+                # Leave byte-identical outputs untouched so unchanged feeds don't churn git
+                if sink.path.is_file() and self._same_content(sink.tmp_path, sink.path):
+                    METRICS.incr('feeds_unchanged')
+                    self.logger.info(f"Unchanged, skipped writing {sink.path}")
+                else:
+                    os.replace(sink.tmp_path, sink.path)
+                    METRICS.incr('feeds_written')
+                    METRICS.incr('bytes_written', sizes[sink.path.name])
+                    self.logger.info(f"Saved to {sink.path}")
+            return sizes
+        finally:
+            # Whatever was not moved into place (unchanged, or abandoned by an error) is removed
+            for sink in sinks:
+                if os.path.exists(sink.tmp_path):
+                    os.remove(sink.tmp_path)
+
+    def _variants(self, path: Path) -> List[tuple]:
+        variants = [(path, True, None)]
+        if self.minify:
+            variants.append((path.with_name(f"{path.stem}.min{path.suffix}"), False, None))
+        if self.compress:
+            # Compress the smallest text variant; clients decompress before parsing anyway
+            base, pretty = variants[-1][0], variants[-1][1]
+            variants.append((base.with_name(base.name + '.gz'), pretty, 'gzip'))
+            if brotli is not None:
+                variants.append((base.with_name(base.name + '.br'), pretty, 'br'))
+        return variants
+
+    def _same_content(self, a: str, b: Path, chunk_size: int = 1 << 16) -> bool:
+        if os.path.getsize(a) != b.stat().st_size:
+            return False
+        with open(a, 'rb') as fa, open(b, 'rb') as fb:
+            while True:
+                ca, cb = fa.read(chunk_size), fb.read(chunk_size)
+                if ca != cb:
+                    return False
+                if not ca:
+                    return True
+
+    def _write(self, sinks: List[_Sink], pretty: str, minified: str):
+        pretty_bytes, minified_bytes = pretty.encode('utf-8'), minified.encode('utf-8')
+        for sink in sinks:
+            sink.stream.write(pretty_bytes if sink.pretty else minified_bytes)
+
+    def _emit(self, sinks: List[_Sink], value, level: int):
+        indent = '  ' * (level + 1)
+        if isinstance(value, dict):
+            if not value:
+                self._write(sinks, '{}', '{}')
+                return
+            self._write(sinks, '{', '{')
+            for i, (key, item) in enumerate(value.items()):
+                sep = ',' if i else ''
+                key_json = json.dumps(key, ensure_ascii=False)
+                self._write(sinks, f"{sep}\n{indent}{key_json}: ", f"{sep}{key_json}:")
+                self._emit(sinks, item, level + 1)
+            self._write(sinks, f"\n{'  ' * level}}}", '}')
+        elif isinstance(value, Iterator):
+            first = True
+            for item in value:
+                self._write(sinks, f"{'[' if first else ','}\n{indent}", '[' if first else ',')
+                self._emit(sinks, item, level + 1)
+                first = False
+            self._write(sinks, '[]' if first else f"\n{'  ' * level}]", '[]' if first else ']')
+        else:
+            # Materialized leaves (entries, plain lists) are dumped whole and re-indented in place
+            pretty = json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n' + '  ' * level)
+            self._write(sinks, pretty, json.dumps(value, ensure_ascii=False, separators=(',', ':')))
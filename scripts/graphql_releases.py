@@ -0,0 +1,101 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+from requests.exceptions import RequestException
+from request_scheduler import RequestScheduler
+
+RELEASE_FIELDS = """
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        databaseId
+        tagName
+        publishedAt
+        releaseAssets(first: 100) { nodes { name size downloadUrl } }
+      }"""
+
+class GraphQLReleaseBackend:
+    """Fetches releases for many repositories per request through the GitHub GraphQL API."""
+
+    def __init__(self, scheduler: RequestScheduler, graphql_url: str, chunk_size: int = 20, page_size: int = 100):
+        # Each repo can expand to page_size releases x 100 assets nodes; GitHub caps a query at 500k nodes
+        if not isinstance(chunk_size, int) or not 1 <= chunk_size * page_size * 101 <= 500000:
+            raise ValueError("chunk_size * page_size must fit within the GraphQL node limit")
+        self.scheduler = scheduler
+        self.graphql_url = graphql_url
+        self.chunk_size = chunk_size
+        self.page_size = page_size
+        self.logger = logging.getLogger("GraphQLReleaseBackend")
+
+    def fetch(self, repos: Dict[Tuple[str, str], str]) -> Dict[Tuple[str, str], object]:
+        """Fetch releases for {(owner, name): watermark} pairs.
+
+        Returns REST-shaped release lists per repo, or the RequestException that stopped it.
+        """
+        results: Dict[Tuple[str, str], object] = {repo: [] for repo in repos}
+        pending: Dict[Tuple[str, str], Optional[str]] = {repo: None for repo in repos}
+        while pending:
+            next_pending = {}
+            items = list(pending.items())
+            for start in range(0, len(items), self.chunk_size):
+                chunk = items[start:start + self.chunk_size]
+                try:
+                    pages = self._query(chunk)
+                except RequestException as e:
+                    self.logger.error(f"GraphQL batch failed: {str(e)}")
+                    for repo, _ in chunk:
+                        results[repo] = e
+                    continue
+
+                for repo, _ in chunk:
+                    page = pages.get(repo)
+                    if page is None:
+                        results[repo] = RequestException(f"Repository {repo[0]}/{repo[1]} not found")
+                        continue
+                    releases = [self._to_rest(node) for node in page['nodes']]
+                    results[repo].extend(releases)
+                    watermark = repos[repo]
+                    # Stop paging once a page reaches releases already seen on an earlier run; drafts have no date
+                    reached = watermark and any(r['published_at'] and r['published_at'] <= watermark
+                                                for r in releases)
+                    if page['pageInfo']['hasNextPage'] and not reached:
+                        next_pending[repo] = page['pageInfo']['endCursor']
+            pending = next_pending
+        return results
+
+    def _query(self, chunk: List[Tuple[Tuple[str, str], Optional[str]]]) -> Dict[Tuple[str, str], Optional[Dict]]:
+        params, fields, variables = [], [], {}
+        for i, ((owner, name), cursor) in enumerate(chunk):
+            params.append(f"$o{i}: String!, $n{i}: String!, $c{i}: String")
+            fields.append(
+                f"  r{i}: repository(owner: $o{i}, name: $n{i}) {{\n"
+                f"    releases(first: {self.page_size}, after: $c{i}, "
+                f"orderBy: {{field: CREATED_AT, direction: DESC}}) {{{RELEASE_FIELDS}\n    }}\n  }}"
+            )
+            variables.update({f"o{i}": owner, f"n{i}": name, f"c{i}": cursor})
+        query = f"query({', '.join(params)}) {{\n" + "\n".join(fields) + "\n}"
+
+        response = self.scheduler.post(self.graphql_url, json={'query': query, 'variables': variables})
+        response.raise_for_status()
+        payload = response.json()
+        data = payload.get('data') or {}
+        for error in payload.get('errors') or []:
+            self.logger.warning(f"GraphQL error: {error.get('message')}")
+        if not data and payload.get('errors'):
+            raise RequestException(payload['errors'][0].get('message', 'GraphQL query failed'))
+
+        return {
+            repo: (data.get(f"r{i}") or {}).get('releases')
+            for i, (repo, _) in enumerate(chunk)
+        }
+
+    def _to_rest(self, node: Dict) -> Dict:
+        # Same shape as the REST releases endpoint so the rule checks apply unchanged
+        return {
+            'id': node.get('databaseId'),
+            'tag_name': node.get('tagName', ''),
+            'published_at': node.get('publishedAt'),
+            'assets': [{
+                'name': asset['name'],
+                'size': asset['size'],
+                'browser_download_url': asset['downloadUrl']
+            } for asset in (node.get('releaseAssets') or {}).get('nodes', [])]
+        }
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, Optional
+
+class HTTPCache:
+    """On-disk cache of GET response bodies keyed by URL and revalidated with ETag/Last-Modified."""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 64 * 1024 * 1024):
+        if not isinstance(max_bytes, int) or max_bytes < 1:
+            raise ValueError("max_bytes must be a positive integer")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger("HTTPCache")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cached entry for a URL, or None if it is missing or unreadable."""
+        try:
+            with open(self._entry_path(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, IOError) as e:
+            self.logger.warning(f"Discarding unreadable cache entry for {url}: {str(e)}")
+            return None
+        return entry if entry.get('url') == url else None
+
+    def conditional_headers(self, entry: Dict) -> Dict:
+        """Build If-None-Match/If-Modified-Since headers from a cached entry."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url: str, response, next_url: Optional[str] = None):
+        """Persist a 200 response if it carries a validator the server can revalidate against."""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        entry = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'next': next_url,
+            'body': response.text
+        }
+        path = self._entry_path(url)
+        tmp_path = None
+        try:
+            # Write-then-rename so concurrent readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except (IOError, PermissionError) as e:
+            self.logger.error(f"Failed to write cache entry for {url}: {str(e)}")
+        finally:
+            # prune() would count an abandoned temp file forever
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def touch(self, url: str):
+        """Mark an entry as recently used so eviction keeps it."""
+        try:
+            os.utime(self._entry_path(url))
+        except OSError:
+            pass
+
+    def prune(self):
+        """Evict least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                evicted += 1
+            except OSError as e:
+                self.logger.error(f"Failed to evict cache entry {path}: {str(e)}")
+        if evicted:
+            self.logger.info(f"Evicted {evicted} cache entries, {total} bytes remaining")
@@ -0,0 +1,183 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import plistlib
+import re
+import struct
+from typing import Dict, Iterable, Optional, Tuple
+import zlib
+from requests.exceptions import RequestException
+from metrics import METRICS
+from request_scheduler import RequestScheduler
+from url_cache import URLCache
+
+EOCD_SIGNATURE = b'PK\x05\x06'
+ZIP64_LOCATOR_SIGNATURE = b'PK\x06\x07'
+ZIP64_EOCD_SIGNATURE = b'PK\x06\x06'
+CENTRAL_SIGNATURE = b'PK\x01\x02'
+LOCAL_SIGNATURE = b'PK\x03\x04'
+# EOCD record plus the longest possible archive comment, plus a ZIP64 locator in front of it
+TAIL_BYTES = 22 + 0xFFFF + 20
+INFO_PLIST = re.compile(r'^Payload/[^/]+\.app/Info\.plist$')
+
+class IPAMetadataError(Exception):
+    """The remote file is not a readable IPA; retrying will not help."""
+
+def _unpack(fmt: str, data: bytes, offset: int = 0) -> Tuple:
+    """struct.unpack_from that reports truncated input as a bad IPA."""
+    try:
+        return struct.unpack_from(fmt, data, offset)
+    except struct.error as e:
+        raise IPAMetadataError(f"truncated archive: {str(e)}") from e
+
+class IPAMetadataExtractor:
+    """Reads an IPA's Info.plist through HTTP range requests: the ZIP tail, the central directory and one entry.
+
+    Servers that ignore Range and answer 200 still work, at the cost of a full download.
+    """
+
+    def __init__(self, scheduler: RequestScheduler, cache: URLCache, workers: int = 8, timeout: int = 30):
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("workers must be a positive integer")
+        self.scheduler = scheduler
+        self.cache = cache
+        self.workers = workers
+        self.timeout = timeout
+        self.logger = logging.getLogger("IPAMetadataExtractor")
+
+    def extract_many(self, assets: Iterable[Tuple[str, Optional[int]]]) -> Dict[str, Dict]:
+        """Return metadata per URL for (url, size) pairs; failures map to {'error': ...}."""
+        results, pending = {}, []
+        for url, size in dict.fromkeys(assets):
+            cached = self.cache.get(URLCache.key(url, size))
+            if cached is not None:
+                METRICS.incr('ipa_cache_hits')
+                results[url] = cached
+            else:
+                pending.append((url, size))
+
+        self.logger.info(f"Inspecting {len(pending)} IPAs ({len(results)} cached)")
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for (url, size), result in zip(pending, pool.map(lambda item: self._extract_cached(*item), pending)):
+                results[url] = result
+        self.cache.save()
+        return results
+
+    def _extract_cached(self, url: str, size: Optional[int]) -> Dict:
+        try:
+            result = self.extract(url)
+        except IPAMetadataError as e:
+            result = {'error': str(e)}
+        except RequestException as e:
+            # Transient; leave it uncached so the next run retries
+            return {'error': str(e)}
+        self.cache.put(URLCache.key(url, size), result)
+        return result
+
+    def extract(self, url: str) -> Dict:
+        """Return the bundle id, short version and minimum OS from a remote IPA's Info.plist."""
+        tail, total = self._read(url, -TAIL_BYTES)
+        # Small files, and servers that ignore Range, hand over the whole file; parse it from memory
+        body = tail if len(tail) == total else None
+        cd_offset, cd_size = self._find_central_directory(url, tail, total, body)
+        central = self._slice(url, cd_offset, cd_size, body)
+        offset, compressed_size, method = self._find_info_plist(central)
+
+        # Fetch the local header and the compressed entry together, guessing a small extra field
+        chunk = self._slice(url, offset, 30 + 512 + compressed_size, body, total)
+        if chunk[:4] != LOCAL_SIGNATURE:
+            raise IPAMetadataError("bad local file header for Info.plist")
+        name_len, extra_len = _unpack('<HH', chunk, 26)
+        start = 30 + name_len + extra_len
+        if start + compressed_size > len(chunk):
+            chunk = chunk[:start] + self._slice(url, offset + len(chunk), start + compressed_size - len(chunk), body)
+        data = chunk[start:start + compressed_size]
+        if len(data) != compressed_size:
+            raise IPAMetadataError("truncated Info.plist entry")
+
+        if method not in (0, 8):
+            raise IPAMetadataError(f"unsupported compression method {method}")
+        try:
+            plist = plistlib.loads(zlib.decompress(data, -15) if method == 8 else data)
+        except Exception as e:
+            raise IPAMetadataError(f"unreadable Info.plist: {str(e)}") from e
+        if not isinstance(plist, dict):
+            raise IPAMetadataError("Info.plist is not a dictionary")
+        return {
+            'bundleID': plist.get('CFBundleIdentifier'),
+            'version': plist.get('CFBundleShortVersionString'),
+            'minOSVersion': plist.get('MinimumOSVersion')
+        }
+
+    def _find_central_directory(self, url: str, tail: bytes, total: int, body: Optional[bytes]) -> Tuple[int, int]:
+        pos = tail.rfind(EOCD_SIGNATURE)
+        if pos < 0 or len(tail) - pos < 22:
+            raise IPAMetadataError("no end of central directory record")
+        entries, cd_size, cd_offset = _unpack('<HII', tail, pos + 10)
+        if entries == 0xFFFF or 0xFFFFFFFF in (cd_size, cd_offset):
+            # ZIP64: the locator sits just before the EOCD and points at the 64-bit record
+            locator = tail[pos - 20:pos]
+            if pos < 20 or locator[:4] != ZIP64_LOCATOR_SIGNATURE:
+                raise IPAMetadataError("missing ZIP64 locator")
+            record_offset, = _unpack('<Q', locator, 8)
+            record = self._slice(url, record_offset, 56, body)
+            if record[:4] != ZIP64_EOCD_SIGNATURE:
+                raise IPAMetadataError("bad ZIP64 end of central directory record")
+            cd_size, cd_offset = _unpack('<QQ', record, 40)
+        if cd_offset + cd_size > total:
+            raise IPAMetadataError("central directory lies outside the file")
+        return cd_offset, cd_size
+
+    def _find_info_plist(self, central: bytes) -> Tuple[int, int, int]:
+        pos = 0
+        while pos + 46 <= len(central) and central[pos:pos + 4] == CENTRAL_SIGNATURE:
+            method, = _unpack('<H', central, pos + 10)
+            compressed_size, uncompressed_size = _unpack('<II', central, pos + 20)
+            name_len, extra_len, comment_len = _unpack('<HHH', central, pos + 28)
+            offset, = _unpack('<I', central, pos + 42)
+            name = central[pos + 46:pos + 46 + name_len].decode('utf-8', 'replace')
+            if INFO_PLIST.match(name):
+                extra = central[pos + 46 + name_len:pos + 46 + name_len + extra_len]
+                return self._apply_zip64_extra(extra, offset, compressed_size, uncompressed_size) + (method,)
+            pos += 46 + name_len + extra_len + comment_len
+        raise IPAMetadataError("no Payload/*.app/Info.plist entry")
+
+    def _apply_zip64_extra(self, extra: bytes, offset: int, compressed_size: int,
+                           uncompressed_size: int) -> Tuple[int, int]:
+        """Resolve 0xFFFFFFFF placeholders from the ZIP64 extended information field."""
+        pos = 0
+        while pos + 4 <= len(extra):
+            tag, size = _unpack('<HH', extra, pos)
+            if tag == 0x0001:
+                # Only the overflowed fields are present, in the order uncompressed, compressed, offset
+                values = list(_unpack(f'<{size // 8}Q', extra, pos + 4))
+                if uncompressed_size == 0xFFFFFFFF and values:
+                    values.pop(0)
+                if compressed_size == 0xFFFFFFFF and values:
+                    compressed_size = values.pop(0)
+                if offset == 0xFFFFFFFF and values:
+                    offset = values.pop(0)
+                break
+            pos += 4 + size
+        return offset, compressed_size
+
+    def _slice(self, url: str, start: int, length: int, body: Optional[bytes], total: Optional[int] = None) -> bytes:
+        if total is not None:
+            length = min(length, total - start)
+        if body is not None:
+            return body[start:start + length]
+        data, _ = self._read(url, start, start + length - 1)
+        return data
+
+    def _read(self, url: str, start: int, end: Optional[int] = None) -> Tuple[bytes, Optional[int]]:
+        """Fetch a byte range (a negative start reads the file's tail) and return it with the file's total size."""
+        byte_range = f"bytes={start}" if start < 0 else f"bytes={start}-{'' if end is None else end}"
+        response = self.scheduler.get(url, headers={'Range': byte_range}, timeout=self.timeout)
+        if response.status_code == 416:
+            raise IPAMetadataError("file is smaller than a ZIP record")
+        response.raise_for_status()
+        if response.status_code != 206:
+            return response.content, len(response.content)
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        if not total.isdigit():
+            raise IPAMetadataError("server did not report the file size")
+        return response.content, int(total)
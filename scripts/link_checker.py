@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from typing import Dict, Iterable, Optional
+from requests.exceptions import RequestException
+from metrics import METRICS
+from request_scheduler import RequestScheduler
+from url_cache import URLCache
+
+class LinkChecker:
+    """Checks that download URLs still resolve and records their size, caching results with a TTL."""
+
+    DEAD_STATUSES = {404, 410}
+
+    def __init__(self, scheduler: RequestScheduler, cache: URLCache, workers: int = 16, timeout: int = 15):
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("workers must be a positive integer")
+        self.scheduler = scheduler
+        self.cache = cache
+        self.workers = workers
+        self.timeout = timeout
+        self.logger = logging.getLogger("LinkChecker")
+
+    def check(self, urls: Iterable[str]) -> Dict[str, Dict]:
+        """Return {'status', 'size'} per URL; transient failures get a None status and an 'error'."""
+        results, pending = {}, []
+        for url in dict.fromkeys(urls):
+            cached = self.cache.get(url)
+            if cached is not None:
+                METRICS.incr('link_cache_hits')
+                results[url] = cached
+            else:
+                pending.append(url)
+
+        self.logger.info(f"Checking {len(pending)} links ({len(results)} cached)")
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for url, result in zip(pending, pool.map(self._probe, pending)):
+                results[url] = result
+                # Only cache definite answers; errors are retried on the next run
+                if result['status'] is not None:
+                    self.cache.put(url, result)
+        self.cache.save()
+        return results
+
+    def is_dead(self, result: Dict) -> bool:
+        return result.get('status') in self.DEAD_STATUSES
+
+    def _probe(self, url: str) -> Dict:
+        try:
+            response = self.scheduler.request('HEAD', url, timeout=self.timeout, allow_redirects=True)
+            size = self._content_length(response)
+            # Signed asset storage often rejects HEAD; a one-byte range GET reports the total size instead
+            if response.status_code in (403, 405) or (response.ok and size is None):
+                response = self.scheduler.request('GET', url, headers={'Range': 'bytes=0-0'}, timeout=self.timeout,
+                                                  allow_redirects=True, stream=True)
+                response.close()
+                size = self._range_total(response) if response.status_code == 206 else self._content_length(response)
+            return {'status': response.status_code, 'size': size if response.ok else None}
+        except RequestException as e:
+            return {'status': None, 'size': None, 'error': str(e)}
+
+    def _content_length(self, response) -> Optional[int]:
+        value = response.headers.get('Content-Length')
+        return int(value) if value and value.isdigit() else None
+
+    def _range_total(self, response) -> Optional[int]:
+        # Content-Range: bytes 0-0/12345
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        return int(total) if total.isdigit() else None
@@ -1,12 +1,49 @@
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import io
 import json
 import logging
 import os
-from typing import Optional
+import time
+from typing import Dict, List, Optional, Tuple, Union
 from PIL import Image
+from app_store import AppStore
+from catalog import Catalog
+from metrics import METRICS, run_instrumented
+
+ASSET_MANIFEST = '.assets.json'
+THUMBNAIL_SIZE = 400
+ICON_SIZES = (64, 128, 256)
+ICON_MASTER_MAX = 1024
+
+def _init_worker():
+    # Forked workers inherit the parent's counters; start clean so only their own work is shipped back
+    METRICS.reset()
 
 class AssetManager:
-    def __init__(self, apps_root: str):
+    def __init__(self, apps_root: str, workers: Optional[int] = None, optimize: bool = True,
+                 quantize: Optional[int] = None, max_dimension: Optional[int] = None, thumbnails: bool = False,
+                 store: Optional[AppStore] = None):
+        # Only an unset worker count means "one per CPU"; 0 or a negative count is a mistake, not a default
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if isinstance(workers, bool) or not isinstance(workers, int) or workers < 1:
+            raise ValueError("workers must be a positive integer")
+        if quantize is not None and not 2 <= quantize <= 256:
+            raise ValueError("quantize must be between 2 and 256 colors")
+        if max_dimension is not None and max_dimension < 1:
+            raise ValueError("max_dimension must be a positive integer")
         self.apps_root = apps_root
+        self.workers = workers
+        self.store = store or AppStore()
+        self.catalog: Optional[Catalog] = None
+        # Recorded with every processed screenshot so changing an option reprocesses it
+        self.screenshot_options = {
+            'optimize': optimize,
+            'quantize': quantize,
+            'max_dimension': max_dimension,
+            'thumbnail': THUMBNAIL_SIZE if thumbnails else None
+        }
         self.logger = self._init_logger()
 
     def _init_logger(self) -> logging.Logger:
@@ -17,106 +54,215 @@ class AssetManager:
         logger.addHandler(handler)
         return logger
 
-    def manage_icons(self, target: Optional[str] = None):
-        """Manage icons and screenshots for all apps or a specific target app."""
-        for app in os.listdir(self.apps_root):
-            path = os.path.join(self.apps_root, app)
-            config_path = os.path.join(path, 'app.json')
+    def manage_icons(self, target: Optional[Union[str, List[str]]] = None):
+        """Manage icons and screenshots for all apps, one app, or a list of apps."""
+        if self.catalog is None:
+            self.catalog = Catalog(self.apps_root, self.store)
+        apps = self.catalog.select([target] if isinstance(target, str) else target)
 
-            if not self._valid_app_path(path, config_path, target):
-                continue
+        timings = {}
+        if self.workers > 1 and len(apps) > 1:
+            # Image work runs in worker processes; app.json updates stay in this process
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(apps)), initializer=_init_worker) as pool:
+                futures = [(app, config_path, pool.submit(self._convert_assets, app, os.path.dirname(config_path)))
+                           for app, config_path in apps]
+                for app, config_path, future in futures:
+                    timings[app] = self._apply_assets(app, config_path, future.result())
+        else:
+            for app, config_path in apps:
+                timings[app] = self._apply_assets(app, config_path, self._convert_assets(app, os.path.dirname(config_path)))
+        self._log_timings(timings)
 
-            self._update_icon(app, config_path)
-            self._update_screenshots(app, config_path)
+    def _convert_assets(self, app_name: str, app_dir: str) -> Dict:
+        """Convert an app's icon and screenshots; safe to run in a worker process."""
+        start = time.perf_counter()
+        manifest = self._load_asset_manifest(app_dir)
+        icon_url, icon_urls = self._convert_and_get_icon_url(app_name, app_dir, manifest)
+        icon_time = time.perf_counter() - start
+        stats = {'bytes_in': 0, 'bytes_out': 0}
+        screenshot_urls = self._convert_and_get_screenshot_urls(app_name, app_dir, manifest, stats)
+        self._save_asset_manifest(app_dir, manifest)
+        return {
+            'icon': icon_url,
+            'icons': icon_urls,
+            'screenshots': screenshot_urls,
+            'bytes_saved': stats['bytes_in'] - stats['bytes_out'],
+            'timings': {'icon': icon_time, 'screenshots': time.perf_counter() - start - icon_time},
+            # Counters incremented in a worker process would otherwise be lost with it
+            'metrics': METRICS.take_counters()
+        }
 
-    def _valid_app_path(self, path: str, config: str, target: Optional[str]) -> bool:
-        """Check if the path is valid and matches the target if specified."""
-        return os.path.isdir(path) and os.path.isfile(config) and (not target or os.path.basename(path) == target)
+    def _apply_assets(self, app_name: str, config_path: str, result: Dict) -> Dict:
+        """Record converted asset URLs in the app's config and return its timings."""
+        start = time.perf_counter()
+        METRICS.merge_counters(result['metrics'])
+        self._update_config(app_name, config_path, result['icon'], result['icons'], result['screenshots'])
+        if result['bytes_saved']:
+            self.logger.info(f"Optimized screenshots for {app_name}: saved {result['bytes_saved']:,} bytes")
+        timings = {**result['timings'], 'config': time.perf_counter() - start}
+        for stage, seconds in timings.items():
+            METRICS.record(stage, seconds, app_name)
+        return {**timings, 'bytes_saved': result['bytes_saved']}
 
-    def _update_icon(self, app_name: str, config_path: str):
-        """Update the icon URL in the app's config."""
+    def _log_timings(self, timings: Dict[str, Dict]):
+        if not timings:
+            return
+        self.logger.info("Per-app timings (icon / screenshots / config, bytes saved):")
+        elapsed = {app: t['icon'] + t['screenshots'] + t['config'] for app, t in timings.items()}
+        for app, t in sorted(timings.items(), key=lambda item: elapsed[item[0]], reverse=True):
+            self.logger.info(f"  {app}: {t['icon'] * 1000:.0f}ms / {t['screenshots'] * 1000:.0f}ms / "
+                             f"{t['config'] * 1000:.0f}ms, {t['bytes_saved']:,} bytes")
+        saved = sum(t['bytes_saved'] for t in timings.values())
+        self.logger.info(f"Processed {len(timings)} apps, {sum(elapsed.values()):.2f}s of work across "
+                         f"{self.workers} workers, saved {saved:,} bytes")
+
+    def _update_config(self, app_name: str, config_path: str, icon_url: str, icon_urls: Dict[str, str],
+                       screenshot_urls: list):
+        """Update the icon URL and screenshots list with a single read and write of the app's config."""
         try:
-            with open(config_path, 'r') as f:
-                data = json.load(f)
+            data = self.store.load(config_path)
         except (FileNotFoundError, json.JSONDecodeError, PermissionError) as e:
             self.logger.error(f"Error reading config for {app_name}: {str(e)}")
             return
 
-        icon_url = self._convert_and_get_icon_url(app_name, os.path.dirname(config_path))
+        changed = False
         if icon_url:
+            changed |= data.get('icon') != icon_url or data.get('icons') != icon_urls
             data['icon'] = icon_url
-            self._save_config(config_path, data)
+            data['icons'] = icon_urls
             self.logger.info(f"Updated icon for {app_name}: {icon_url}")
         else:
             self.logger.info(f"No icon found for {app_name}")
 
-    def _update_screenshots(self, app_name: str, config_path: str):
-        """Update the screenshots list in the app's config."""
-        try:
-            with open(config_path, 'r') as f:
-                data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError, PermissionError) as e:
-            self.logger.error(f"Error reading config for {app_name}: {str(e)}")
-            return
-
-        screenshot_urls = self._convert_and_get_screenshot_urls(app_name, os.path.dirname(config_path))
         if screenshot_urls:
+            changed |= data.get('screenshots') != screenshot_urls
             data['screenshots'] = screenshot_urls
-            self._save_config(config_path, data)
             self.logger.info(f"Updated screenshots for {app_name}: {len(screenshot_urls)} found")
         else:
             self.logger.info(f"No screenshots found for {app_name}")
 
-    def _convert_and_get_icon_url(self, app_name: str, app_dir: str) -> str:
-        """Convert icon to PNG 128x128 and return URL, skipping if already correct."""
-        preferred_icon_path = os.path.join(app_dir, 'icon.png')
+        if changed:
+            self._save_config(config_path, data)
+
+    def _load_asset_manifest(self, app_dir: str) -> Dict:
+        """Load the sidecar recording source/output hashes and dimensions of processed assets."""
+        try:
+            manifest = self.store.load(os.path.join(app_dir, ASSET_MANIFEST))
+            return manifest if isinstance(manifest, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, IOError) as e:
+            self.logger.warning(f"Ignoring unreadable asset manifest in {app_dir}: {str(e)}")
+            return {}
+
+    def _save_asset_manifest(self, app_dir: str, manifest: Dict):
+        path = os.path.join(app_dir, ASSET_MANIFEST)
+        if manifest or os.path.exists(path):
+            self._save_config(path, manifest)
 
-        # Check if icon.png exists
-        if os.path.isfile(preferred_icon_path):
+    def _file_sha256(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _needs_rgb(self, img: Image.Image) -> bool:
+        return img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+
+    def _convert_and_get_icon_url(self, app_name: str, app_dir: str, manifest: Dict) -> Tuple[str, Dict[str, str]]:
+        """Normalize the master icon.png, derive the sized icon set and return the master and derivative URLs."""
+        master_path = os.path.join(app_dir, 'icon.png')
+
+        if os.path.isfile(master_path):
             try:
-                with Image.open(preferred_icon_path) as img:
-                    if img.size == (128, 128):
-                        # Already 128x128, no need to process
-                        return f"https://raw.githubusercontent.com/DRKCTRLDEV/DRKSRC/main/Apps/{app_name}/icon.png"
-                    else:
-                        # Resize to 128x128
-                        img_resized = img.resize((128, 128), Image.Resampling.LANCZOS)
-                        # Convert to RGB to match original behavior (optional: keep transparency if desired)
-                        if img_resized.mode in ('RGBA', 'LA') or (img_resized.mode == 'P' and 'transparency' in img_resized.info):
-                            img_resized = img_resized.convert('RGB')
-                        img_resized.save(preferred_icon_path, 'PNG')
-                        return f"https://raw.githubusercontent.com/DRKCTRLDEV/DRKSRC/main/Apps/{app_name}/icon.png"
+                return self._derive_icons(app_name, app_dir, master_path, manifest)
             except Exception as e:
                 self.logger.error(f"Failed to process existing icon.png for {app_name}: {str(e)}")
                 # Proceed to look for other icons
 
-        # Look for other icon files
+        # Look for other icon files to promote to the master
         other_extensions = ['.jpg', '.jpeg', '.webp']
         for ext in other_extensions:
             icon_path = os.path.join(app_dir, f'icon{ext}')
             if os.path.isfile(icon_path):
                 try:
                     with Image.open(icon_path) as img:
-                        # Convert to RGB to match original behavior
-                        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-                            img = img.convert('RGB')
-                        # Resize to 128x128
-                        img_resized = img.resize((128, 128), Image.Resampling.LANCZOS)
-                        # Save as PNG for lossless quality
-                        img_resized.save(preferred_icon_path, 'PNG')
-                        # Remove original
-                        os.remove(icon_path)
-                        return f"https://raw.githubusercontent.com/DRKCTRLDEV/DRKSRC/main/Apps/{app_name}/icon.png"
+                        self._normalize_icon(img).save(master_path, 'PNG', optimize=True)
+                    # Remove original
+                    os.remove(icon_path)
+                    return self._derive_icons(app_name, app_dir, master_path, manifest)
                 except Exception as e:
                     self.logger.error(f"Failed to convert icon{ext} for {app_name}: {str(e)}")
                     continue
 
-        return ""
+        if not os.path.isfile(master_path):
+            manifest.pop('icon', None)
+        return "", {}
+
+    def _derive_icons(self, app_name: str, app_dir: str, master_path: str, manifest: Dict) -> Tuple[str, Dict[str, str]]:
+        base_url = f"https://raw.githubusercontent.com/DRKCTRLDEV/DRKSRC/main/Apps/{app_name}"
+        digest = self._file_sha256(master_path)
+        cached = manifest.get('icon', {})
+        derivatives = cached.get('derivatives')
+        if cached.get('output_sha256') == digest and derivatives is not None and all(
+                os.path.isfile(os.path.join(app_dir, 'icons', f'icon-{size}.png')) for size in derivatives):
+            # Master unchanged since the derivatives were generated
+            METRICS.incr('images_skipped')
+            return f"{base_url}/icon.png", {size: f"{base_url}/icons/icon-{size}.png" for size in derivatives}
+
+        METRICS.incr('images_processed')
+        with Image.open(master_path) as img:
+            entry = {'source_sha256': digest, 'size': list(img.size)}
+            if self._needs_rgb(img) or max(img.size) > ICON_MASTER_MAX or img.width != img.height:
+                img = self._normalize_icon(img)
+                img.save(master_path, 'PNG', optimize=True)
+            # Never upscale: masters smaller than every size are served as they are
+            derivatives = {}
+            for size in (size for size in ICON_SIZES if size <= img.width):
+                path = os.path.join(app_dir, 'icons', f'icon-{size}.png')
+                resized = img.resize((size, size), Image.Resampling.LANCZOS)
+                if self._needs_rgb(resized):
+                    resized = resized.convert('RGB')
+                derivatives[str(size)] = self._write_if_changed(path, self._encode_png(resized, optimize=True))
 
-    def _convert_and_get_screenshot_urls(self, app_name: str, app_dir: str) -> list:
+        # Drop derivatives of sizes the current master can no longer provide
+        for size in ICON_SIZES:
+            stale = os.path.join(app_dir, 'icons', f'icon-{size}.png')
+            if str(size) not in derivatives and os.path.isfile(stale):
+                os.remove(stale)
+        manifest['icon'] = {**entry, 'output_sha256': self._file_sha256(master_path), 'derivatives': derivatives}
+        return f"{base_url}/icon.png", {size: f"{base_url}/icons/icon-{size}.png" for size in derivatives}
+
+    def _normalize_icon(self, img: Image.Image) -> Image.Image:
+        # Convert to RGB to match original behavior
+        if self._needs_rgb(img):
+            img = img.convert('RGB')
+        if img.width != img.height:
+            # Center-crop to a square so resizing never distorts
+            side = min(img.size)
+            left, top = (img.width - side) // 2, (img.height - side) // 2
+            img = img.crop((left, top, left + side, top + side))
+        if max(img.size) > ICON_MASTER_MAX:
+            img = img.copy()
+            img.thumbnail((ICON_MASTER_MAX, ICON_MASTER_MAX), Image.Resampling.LANCZOS)
+        return img
+
+    def _write_if_changed(self, path: str, content: bytes) -> str:
+        """Write bytes unless the file already holds them and return their SHA-256."""
+        digest = hashlib.sha256(content).hexdigest()
+        if not os.path.isfile(path) or self._file_sha256(path) != digest:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+            METRICS.incr('bytes_written', len(content))
+        return digest
+
+    def _convert_and_get_screenshot_urls(self, app_name: str, app_dir: str, manifest: Dict, stats: Dict) -> list:
         """Convert screenshots to PNG with progressive naming, max 4, and return list of URLs."""
         screenshots_dir = os.path.join(app_dir, 'screenshots')
         if not os.path.isdir(screenshots_dir):
+            manifest.pop('screenshots', None)
             return []
 
         supported_extensions = ['.jpg', '.jpeg', '.png', '.webp']
@@ -128,11 +274,15 @@ class AssetManager:
                 screenshot_files.append(filename)
         
         if not screenshot_files:
+            manifest.pop('screenshots', None)
             return []
             
         # Limit to 4 screenshots
         screenshot_files = sorted(screenshot_files)[:4]
         new_screenshot_urls = []
+        cached_entries = manifest.get('screenshots', {})
+        new_entries = {}
+        base_url = f"https://raw.githubusercontent.com/DRKCTRLDEV/DRKSRC/main/Apps/{app_name}/screenshots"
         
         # Convert and rename each screenshot
         for i, filename in enumerate(screenshot_files, 1):
@@ -141,16 +291,48 @@ class AssetManager:
             output_path = os.path.join(screenshots_dir, new_filename)
             
             try:
+                digest = self._file_sha256(input_path)
+                cached = cached_entries.get(new_filename, {})
+                thumbnail_path = os.path.join(screenshots_dir, 'thumbs', f"IMG_{i}.webp")
+                if (input_path == output_path and cached.get('output_sha256') == digest
+                        and cached.get('options') == self.screenshot_options
+                        and (not self.screenshot_options['thumbnail'] or os.path.isfile(thumbnail_path))):
+                    # Our own output, untouched since the last run
+                    METRICS.incr('images_skipped')
+                    new_entries[new_filename] = cached
+                    new_screenshot_urls.append(f"{base_url}/{new_filename}")
+                    continue
+
+                source_size = os.path.getsize(input_path)
                 # Open and convert the image
                 with Image.open(input_path) as img:
-                    # Convert to RGB to match original behavior (optional: keep transparency if desired)
-                    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-                        img = img.convert('RGB')
-                    # Save as PNG for lossless quality, keeping original dimensions
-                    img.save(output_path, 'PNG')
+                    entry = {'source_sha256': digest, 'size': list(img.size), 'options': self.screenshot_options}
+                    source_mode = img.mode
+                    if not self._needs_processing(img, input_path == output_path):
+                        # Already normalized; only the header was read
+                        METRICS.incr('images_skipped')
+                        new_entries[new_filename] = {**entry, 'output_sha256': digest}
+                        new_screenshot_urls.append(f"{base_url}/{new_filename}")
+                        continue
+                    METRICS.incr('images_processed')
+                    img = self._optimize_screenshot(img)
+                    encoded = self._encode_png(img)
+                    if self.screenshot_options['thumbnail']:
+                        self._save_thumbnail(img, thumbnail_path)
+                # Keep the source bytes only when re-encoding an unresized PNG in place, already in the
+                # target mode, would not shrink it
+                keep_source = (input_path == output_path and len(encoded) >= source_size
+                               and list(img.size) == entry['size'] and img.mode == source_mode
+                               and not self.screenshot_options['quantize'])
+                if not keep_source:
+                    with open(output_path, 'wb') as f:
+                        f.write(encoded)
+                    METRICS.incr('bytes_written', len(encoded))
+                stats['bytes_in'] += source_size
+                stats['bytes_out'] += os.path.getsize(output_path)
+                new_entries[new_filename] = {**entry, 'output_sha256': self._file_sha256(output_path)}
                 
                 # Add URL to list
-                base_url = f"https://raw.githubusercontent.com/DRKCTRLDEV/DRKSRC/main/Apps/{app_name}/screenshots"
                 new_screenshot_urls.append(f"{base_url}/{new_filename}")
                 
                 # Remove original if different from new file
@@ -161,27 +343,73 @@ class AssetManager:
                 self.logger.error(f"Failed to convert screenshot {filename} for {app_name}: {str(e)}")
                 continue
 
+        manifest['screenshots'] = new_entries
         return new_screenshot_urls
 
+    def _needs_processing(self, img: Image.Image, in_place: bool) -> bool:
+        """Decide from the header alone whether a screenshot must be decoded and re-encoded."""
+        options = self.screenshot_options
+        if not in_place or img.format != 'PNG' or self._needs_rgb(img):
+            return True
+        if options['max_dimension'] and max(img.size) > options['max_dimension']:
+            return True
+        if options['quantize'] and img.mode != 'P':
+            return True
+        return bool(options['optimize'] or options['thumbnail'])
+
+    def _optimize_screenshot(self, img: Image.Image) -> Image.Image:
+        # Convert to RGB to match original behavior (optional: keep transparency if desired)
+        if self._needs_rgb(img):
+            img = img.convert('RGB')
+        max_dimension = self.screenshot_options['max_dimension']
+        if max_dimension and max(img.size) > max_dimension:
+            img = img.copy()
+            img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        if self.screenshot_options['quantize'] and img.mode != 'P':
+            img = img.convert('RGB').quantize(colors=self.screenshot_options['quantize'],
+                                              method=Image.Quantize.FASTOCTREE)
+        return img
+
+    def _encode_png(self, img: Image.Image, optimize: Optional[bool] = None) -> bytes:
+        buffer = io.BytesIO()
+        img.save(buffer, 'PNG', optimize=self.screenshot_options['optimize'] if optimize is None else optimize)
+        return buffer.getvalue()
+
+    def _save_thumbnail(self, img: Image.Image, path: str):
+        """Write a small WebP preview of a screenshot."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        thumbnail = img.convert('RGB')
+        thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
+        thumbnail.save(path, 'WEBP', quality=80, method=6)
+
     def _save_config(self, path: str, data: dict):
         """Save the updated config data."""
-        try:
-            with open(path, 'w') as f:
-                json.dump(data, f, indent=4)
-        except (IOError, PermissionError) as e:
-            self.logger.error(f"Failed to save config {path}: {str(e)}")
+        self.store.save(path, data)
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Manage app assets")
     parser.add_argument("--apps", type=str, help="Comma-separated list of app names")
+    parser.add_argument("--workers", type=int, help="Number of image worker processes (default: CPU count)")
+    parser.add_argument("--no-optimize", action="store_true", help="Skip optimized PNG encoding of screenshots")
+    parser.add_argument("--quantize", type=int, help="Quantize screenshots to a palette of this many colors")
+    parser.add_argument("--max-dimension", type=int, help="Downscale screenshots whose longest side exceeds this")
+    parser.add_argument("--thumbnails", action="store_true", help="Write WebP preview thumbnails to screenshots/thumbs")
+    parser.add_argument("--metrics-out", type=str, help="Write a JSON metrics report to this path")
+    parser.add_argument("--profile", type=str, help="Run under cProfile and dump stats to this path")
     args = parser.parse_args()
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be a positive integer")
 
     logging.basicConfig(level=logging.INFO)
     current_dir = os.path.dirname(os.path.abspath(__file__))
     apps_dir = os.path.join(current_dir, "..", "Apps")
-    manager = AssetManager(apps_dir)
-    targets = args.apps.split(",") if args.apps else [None]
-    for target in targets:
-        manager.manage_icons(target.strip() if target else None)
\ No newline at end of file
+    manager = AssetManager(apps_dir, workers=args.workers, optimize=not args.no_optimize, quantize=args.quantize,
+                           max_dimension=args.max_dimension, thumbnails=args.thumbnails)
+    targets = [target.strip() for target in args.apps.split(",") if target.strip()] if args.apps else None
+
+    def run():
+        manager.manage_icons(targets)
+
+    run_instrumented("manage_assets", run, args.metrics_out, args.profile)
\ No newline at end of file
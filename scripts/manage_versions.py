@@ -1,19 +1,74 @@
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import json
 import logging
 import os
-from typing import Dict, Optional
+import sys
+import threading
+from typing import Dict, List, Optional, Set, Tuple, Union
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 import yaml
+from app_store import AppStore
+from asset_hasher import AssetHasher
+from catalog import Catalog
+from graphql_releases import GraphQLReleaseBackend
+from http_cache import HTTPCache
+from ipa_metadata import IPAMetadataExtractor
+from link_checker import LinkChecker
+from metrics import METRICS, run_instrumented
+from release_history import ReleaseHistory
+from release_rules import ReleaseRules, RulesError, load_rules, version_key
+from request_scheduler import RequestScheduler
+from url_cache import URLCache
 
 class VersionManager:
-    def __init__(self, apps_root: str, keep_versions: int = 10):
+    def __init__(self, apps_root: str, keep_versions: int = 10, workers: int = 8,
+                 cache_dir: Optional[str] = None, cache_max_bytes: int = 64 * 1024 * 1024,
+                 api_url: Optional[str] = None, full_resync: bool = False,
+                 tokens: Optional[List[str]] = None, backend: str = 'rest',
+                 store: Optional[AppStore] = None, link_cache: Optional[str] = None,
+                 link_ttl: float = 7 * 86400, drop_dead: bool = False, ipa_cache: Optional[str] = None,
+                 digest_cache: Optional[str] = None, hash_workers: int = 4,
+                 history_db: Optional[str] = None):
         if not isinstance(keep_versions, int) or keep_versions < 1:
             raise ValueError("keep_versions must be a positive integer")
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("workers must be a positive integer")
+        if backend not in ('rest', 'graphql'):
+            raise ValueError("backend must be 'rest' or 'graphql'")
         self.apps_root = apps_root
         self.keep_versions = keep_versions
+        self.workers = workers
         self.logger = self._init_logger()
+        self.store = store or AppStore()
+        self.session = self._init_session()
+        self.scheduler = RequestScheduler(self.session, tokens if tokens is not None else self._env_tokens())
+        self.cache = HTTPCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.api_url = (api_url or os.environ.get("GITHUB_API_URL") or "https://api.github.com").rstrip('/')
+        self.full_resync = full_resync
+        self.link_cache = link_cache
+        self.link_ttl = link_ttl
+        self.drop_dead = drop_dead
+        self.ipa_cache = ipa_cache
+        self.digest_cache = digest_cache
+        self.hash_workers = hash_workers
+        self.history = ReleaseHistory(history_db) if history_db else None
+        self.backend = backend
+        self.graphql = None
+        if backend == 'graphql':
+            # GraphQL has its own rate-limit budget, so it gets its own scheduler over the same session
+            self.graphql = GraphQLReleaseBackend(RequestScheduler(self.session, self.scheduler.tokens,
+                                                                  name="GraphQLScheduler"),
+                                                 f"{self.api_url}/graphql")
+        self._prefetched: Dict[Tuple[str, str], object] = {}
+        self._rules: Dict[str, ReleaseRules] = {}
+        self._shared: Dict[Tuple[str, str], str] = {}
+        self._fetched: Dict[Tuple[str, str], object] = {}
+        self._repo_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._fetch_lock = threading.Lock()
+        self.catalog: Optional[Catalog] = None
 
     def _init_logger(self) -> logging.Logger:
         logger = logging.getLogger("VersionManager")
@@ -23,33 +78,180 @@ class VersionManager:
         logger.addHandler(handler)
         return logger
 
-    def manage(self, action: str, target: Optional[str] = None, keep: Optional[int] = None):
-        self.keep_versions = max(1, keep or self.keep_versions)
-        for app in os.listdir(self.apps_root):
-            path = os.path.join(self.apps_root, app)
-            config_path = os.path.join(path, 'app.json')
+    def _init_session(self) -> requests.Session:
+        # One keep-alive pool shared by every worker thread
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
 
-            if not self._valid_app_path(path, config_path, target):
-                continue
+    def _env_tokens(self) -> List[str]:
+        # GITHUB_TOKENS optionally adds extra comma-separated tokens to rotate across
+        tokens = [os.environ.get("GITHUB_TOKEN", "")] + os.environ.get("GITHUB_TOKENS", "").split(',')
+        return list(dict.fromkeys(t.strip() for t in tokens if t.strip()))
+
+    def manage(self, action: str, target: Optional[Union[str, List[str]]] = None, keep: Optional[int] = None):
+        """Run an action on every app, one app, or a list of apps."""
+        self.keep_versions = max(1, keep or self.keep_versions)
+        if self.catalog is None:
+            self.catalog = Catalog(self.apps_root, self.store)
+        apps = self.catalog.select([target] if isinstance(target, str) else target)
 
-            if action == 'update':
-                self._update_versions(app, config_path)
-            elif action == 'remove':
+        if action == 'update':
+            self._compile_rules(apps)
+            repo_watermarks = self._repo_watermarks(apps)
+            # Repos used by several apps are fetched once, back to the oldest watermark among them
+            self._shared = {key: min(marks) for key, marks in repo_watermarks.items() if len(marks) > 1}
+            if self.graphql and self.scheduler.tokens:
+                with METRICS.timer('prefetch'):
+                    self.logger.info(f"Prefetching releases for {len(repo_watermarks)} repos via GraphQL")
+                    self._prefetched = self.graphql.fetch({key: min(marks) for key, marks in repo_watermarks.items()})
+            # Each app owns its own config file, so apps can be fetched and saved independently
+            with METRICS.timer('update'), ThreadPoolExecutor(max_workers=self.workers) as pool:
+                list(pool.map(lambda item: self._update_versions(*item), apps))
+            if self.cache:
+                self.cache.prune()
+            self.scheduler.log_report()
+            if self.graphql:
+                self.graphql.scheduler.log_report()
+            self._prefetched, self._rules, self._shared, self._fetched = {}, {}, {}, {}
+        elif action == 'check':
+            self._check_links(apps)
+        elif action == 'inspect':
+            self._inspect_ipas(apps)
+        elif action == 'hash':
+            self._hash_assets(apps)
+        elif action == 'rederive':
+            if not self.history:
+                self.logger.error("Re-deriving versions needs a release history database")
+                return
+            self._compile_rules(apps)
+            for app, config_path in apps:
+                self._rederive_versions(app, config_path)
+            self._rules = {}
+        elif action == 'remove':
+            for app, config_path in apps:
                 self._remove_versions(app, config_path)
 
-    def _valid_app_path(self, path: str, config: str, target: Optional[str]) -> bool:
-        return os.path.isdir(path) and os.path.isfile(config) and (not target or os.path.basename(path) == target)
+    def _repo_watermarks(self, apps: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[str]]:
+        """Watermark of every app that uses each repo, keyed by case-folded (owner, name)."""
+        repos: Dict[Tuple[str, str], List[str]] = {}
+        for app, config_path in apps:
+            watermarks = {} if self.full_resync else self._load_watermarks(os.path.dirname(config_path))
+            for repo in dict.fromkeys(self.catalog.repos(app)):
+                if self._valid_gh_url(repo):
+                    repos.setdefault(self._repo_key(repo), []).append(watermarks.get(repo, ''))
+        return repos
+
+    def _load_configs(self, apps: List[Tuple[str, str]]) -> List[Tuple[str, str, Dict]]:
+        """Load the config of every app, logging and skipping the ones that cannot be read."""
+        configs = []
+        for app, config_path in apps:
+            try:
+                configs.append((app, config_path, self.store.load(config_path)))
+            except (FileNotFoundError, json.JSONDecodeError, PermissionError) as e:
+                self.logger.error(f"Failed to load config for {app}: {str(e)}")
+        return configs
+
+    def _check_links(self, apps: List[Tuple[str, str]]):
+        """Probe every version URL, correct stale sizes and flag (or drop) versions whose asset is gone."""
+        configs = self._load_configs(apps)
+        # Download hosts are not the API: no token, and no rate-limit budget to share
+        checker = LinkChecker(RequestScheduler(self.session, [], name="LinkScheduler"),
+                              URLCache(self.link_cache, self.link_ttl), self.workers)
+        results = checker.check(v['url'] for _, _, data in configs for v in data.get('versions', []) if v.get('url'))
+
+        for app, config_path, data in configs:
+            versions, fixed, dead = [], 0, 0
+            for version in data.get('versions', []):
+                result = results.get(version.get('url'), {})
+                if checker.is_dead(result):
+                    dead += 1
+                    self.logger.warning(f"Dead download for {app} {version.get('version')}: "
+                                        f"HTTP {result['status']} {version['url']}")
+                    if self.drop_dead:
+                        continue
+                elif result.get('size') and version.get('size') != result['size']:
+                    version['size'] = result['size']
+                    fixed += 1
+                versions.append(version)
+            if fixed or (dead and self.drop_dead):
+                data['versions'] = versions
+                self._save_config(config_path, data)
+                self.logger.info(f"Checked {app}: fixed {fixed} sizes, "
+                                 f"{'dropped' if self.drop_dead else 'flagged'} {dead} dead versions")
+
+        errors = sum(1 for result in results.values() if result.get('status') is None)
+        dead = sum(1 for result in results.values() if checker.is_dead(result))
+        self.logger.info(f"Checked {len(results)} links: {dead} dead, {errors} unreachable")
+
+    def _inspect_ipas(self, apps: List[Tuple[str, str]]):
+        """Record bundle id, version and minimum OS from the Info.plist of versions not inspected yet."""
+        configs = self._load_configs(apps)
+        extractor = IPAMetadataExtractor(RequestScheduler(self.session, [], name="IPAScheduler"),
+                                         URLCache(self.ipa_cache), self.workers)
+        pending = [v for _, _, data in configs for v in data.get('versions', [])
+                   if 'ipa' not in v and v.get('url', '').lower().endswith(('.ipa', '.tipa'))]
+        results = extractor.extract_many((v['url'], v.get('size')) for v in pending)
+
+        for app, config_path, data in configs:
+            inspected = 0
+            for version in data.get('versions', []):
+                result = results.get(version.get('url'))
+                if 'ipa' in version or not result:
+                    continue
+                if result.get('error'):
+                    self.logger.warning(f"Could not inspect {app} {version.get('version')}: {result['error']}")
+                    continue
+                version['ipa'] = {key: value for key, value in result.items() if value is not None and key != 'checked'}
+                if data.get('bundleID') and result.get('bundleID') not in (None, data['bundleID']):
+                    self.logger.warning(f"{app} {version.get('version')} is bundle {result['bundleID']}, "
+                                        f"app.json says {data['bundleID']}")
+                inspected += 1
+            if inspected:
+                self._save_config(config_path, data)
+                self.logger.info(f"Inspected {inspected} IPAs for {app}")
+
+    def _hash_assets(self, apps: List[Tuple[str, str]]):
+        """Record the SHA-256 of every version asset that does not have one yet."""
+        configs = self._load_configs(apps)
+        hasher = AssetHasher(RequestScheduler(self.session, [], name="HashScheduler"),
+                             URLCache(self.digest_cache), self.hash_workers)
+        results = hasher.hash_many((v['url'], v.get('size')) for _, _, data in configs
+                                   for v in data.get('versions', []) if v.get('url') and not v.get('sha256'))
+
+        for app, config_path, data in configs:
+            hashed = 0
+            for version in data.get('versions', []):
+                result = results.get(version.get('url'))
+                if version.get('sha256') or not result:
+                    continue
+                if result.get('error'):
+                    self.logger.warning(f"Could not hash {app} {version.get('version')}: {result['error']}")
+                    continue
+                if version.get('size') != result['size']:
+                    self.logger.info(f"Corrected size of {app} {version.get('version')} to {result['size']}")
+                    version['size'] = result['size']
+                version['sha256'] = result['sha256']
+                hashed += 1
+            if hashed:
+                self._save_config(config_path, data)
+                self.logger.info(f"Hashed {hashed} assets for {app}")
 
     def _update_versions(self, app: str, config: str):
-        self._process_versions(app, config, update=True)
+        with METRICS.timer('update', app):
+            self._process_versions(app, config, 'update')
 
     def _remove_versions(self, app: str, config: str):
-        self._process_versions(app, config, update=False)
+        self._process_versions(app, config, 'remove')
 
-    def _process_versions(self, app: str, config: str, update: bool):
+    def _rederive_versions(self, app: str, config: str):
+        self._process_versions(app, config, 'rederive')
+
+    def _process_versions(self, app: str, config: str, action: str):
         try:
-            with open(config, 'r') as f:
-                data = json.load(f)
+            data = self.store.load(config)
         except FileNotFoundError:
             self.logger.error(f"Config file not found for {app}")
             return
@@ -63,89 +265,236 @@ class VersionManager:
         if not self._valid_repo(data.get('gitURLs')):
             return
 
-        if update:
-            result = self._fetch_new_versions(data, os.path.dirname(config))
+        if action == 'update':
+            app_dir = os.path.dirname(config)
+            result = self._fetch_new_versions(data, app_dir)
             if not result['success']:
                 self.logger.error(f"Failed to update {app}: {result['message']}")
                 return
             new_versions = result['versions']
-            all_versions = data.get('versions', []) + new_versions
-            sorted_versions = sorted(all_versions, key=lambda x: x['date'], reverse=True)[:self.keep_versions]
+            rules = self._rules.get(app_dir) or self._load_rules(app_dir)
+            sorted_versions = self._sort_versions(data.get('versions', []) + new_versions, rules)
             data['versions'] = sorted_versions
             added_count = sum(1 for v in sorted_versions if v in new_versions)
             self.logger.info(f"Updated {app}, added {added_count} new versions, total {len(sorted_versions)} versions")
+            # Only advance the watermarks once the versions they cover are safely on disk
+            if self._save_config(config, data):
+                self._save_watermarks(app_dir, result['watermarks'])
+        elif action == 'rederive':
+            versions = self._rederive_from_history(app, data, os.path.dirname(config))
+            if versions is None:
+                return
+            data['versions'] = versions
+            self.logger.info(f"Re-derived {app} from stored history, total {len(versions)} versions")
+            self._save_config(config, data)
         else:
             data['versions'] = []
             self.logger.info(f"Removed all versions for {app}")
-
-        self._save_config(config, data)
+            if self._save_config(config, data):
+                self._save_watermarks(os.path.dirname(config), {})
 
     def _fetch_new_versions(self, data: Dict, app_dir: str) -> Dict:
         repos = data.get('gitURLs', [])
         repos = [repos] if isinstance(repos, str) else repos
         existing = {v['url'] for v in data.get('versions', [])}
-        versions_by_version = {}
-        rules = self._load_rules(app_dir)
-        preferred_extensions = rules.get('preferred_extensions', ['.tipa', '.ipa'])
+        fresh = []
+        watermarks = {} if self.full_resync else self._load_watermarks(app_dir)
+        rules = self._rules.get(app_dir) or self._load_rules(app_dir)
 
-        token = os.environ.get("GITHUB_TOKEN")
-        if not token:
+        if not self.scheduler.tokens:
             self.logger.error("GitHub token (GITHUB_TOKEN) not set in environment")
-            return {'success': False, 'message': 'Missing GitHub token', 'versions': []}
-        headers = {'Authorization': f'token {token}'}
+            return {'success': False, 'message': 'Missing GitHub token', 'versions': [], 'watermarks': {}}
 
         for repo in repos:
             if not self._valid_gh_url(repo):
                 continue
-            owner, repo_name = repo.rstrip('/').split('/')[-2:]
-            url = f'https://api.github.com/repos/{owner}/{repo_name}/releases'
-
-            while url:
-                try:
-                    response = requests.get(url, headers=headers, timeout=10)
-                    response.raise_for_status()
-                    releases = response.json()
-                    for release in releases:
-                        for asset in release.get('assets', []):
-                            if self._should_include_asset(asset, rules):
-                                version_str = self._format_version_number(release['tag_name'], rules)
-                                if rules.get('exclude_patterns') and any(pattern.lower() in version_str.lower() for pattern in rules['exclude_patterns']):
-                                    continue
-                                version = {
-                                    'version': version_str,
-                                    'date': release['published_at'].split('T')[0],
-                                    'size': asset['size'],
-                                    'url': asset['browser_download_url']
-                                }
-                                if version['url'] not in existing:
-                                    current = versions_by_version.get(version_str)
-                                    if not current or self._is_preferred_asset(version, current, preferred_extensions):
-                                        versions_by_version[version_str] = version
-                    url = response.links.get('next', {}).get('url')
-                except RequestException as e:
-                    self.logger.error(f"API error for {repo}: {str(e)}")
-                    return {'success': False, 'message': f"API error: {str(e)}", 'versions': []}
-
-        new_versions = list(versions_by_version.values())
+            watermark = watermarks.get(repo)
+            try:
+                releases = self._fetch_releases(repo, watermark)
+            except RequestException as e:
+                self.logger.error(f"API error for {repo}: {str(e)}")
+                return {'success': False, 'message': f"API error: {str(e)}", 'versions': [], 'watermarks': {}}
+            if self.history:
+                self.history.record(repo, releases)
+
+            for release in releases:
+                published = release.get('published_at')
+                if not published:
+                    # Drafts have no publish date yet; they are picked up once published
+                    continue
+                if published > watermarks.get(repo, ''):
+                    watermarks[repo] = published
+                if not (watermark and published <= watermark):
+                    fresh.append(release)
+
+        new_versions = list(self._select_versions(fresh, rules, existing).values())
         new_count = len(new_versions)
         return {
             'success': True,
             'message': f"Fetched {new_count} new versions" if new_count > 0 else "No new versions",
-            'versions': new_versions
+            'versions': new_versions,
+            'watermarks': watermarks
         }
 
-    def _is_preferred_asset(self, new: Dict, current: Dict, preferred_extensions: list) -> bool:
-        new_ext = os.path.splitext(new['url'])[1].lower()
-        current_ext = os.path.splitext(current['url'])[1].lower()
-        new_priority = preferred_extensions.index(new_ext) if new_ext in preferred_extensions else len(preferred_extensions)
-        current_priority = preferred_extensions.index(current_ext) if current_ext in preferred_extensions else len(preferred_extensions)
+    def _select_versions(self, releases: List[Dict], rules: ReleaseRules, existing: Set[str]) -> Dict[str, Dict]:
+        """Apply an app's rules to releases, keeping the preferred asset per version string."""
+        versions_by_version = {}
+        for release in releases:
+            if not release.get('published_at'):
+                continue
+            version_str = rules.format_version(release['tag_name'])
+            if rules.excluded_version(version_str):
+                continue
+            assets = [asset for asset in release.get('assets', []) if rules.include_asset(asset['name'])]
+            if any(asset['browser_download_url'] in existing for asset in assets):
+                # Already recorded; a re-fetch (e.g. --full-resync) must not add its other assets as duplicates
+                continue
+            for asset in assets:
+                version = {
+                    'version': version_str,
+                    'date': release['published_at'].split('T')[0],
+                    'size': asset['size'],
+                    'url': asset['browser_download_url']
+                }
+                current = versions_by_version.get(version_str)
+                if not current or self._is_preferred_asset(version, current, rules):
+                    versions_by_version[version_str] = version
+        return versions_by_version
+
+    def _rederive_from_history(self, app: str, data: Dict, app_dir: str) -> Optional[List[Dict]]:
+        """Rebuild an app's versions from stored releases with its current rules, without network access."""
+        repos = data.get('gitURLs', [])
+        repos = [repos] if isinstance(repos, str) else repos
+        releases = [release for repo in repos if self._valid_gh_url(repo) for release in self.history.releases(repo)]
+        if not releases:
+            # Watermarked updates only fetch (and so only record) new pages; the full history needs a resync
+            self.logger.warning(f"No stored release history for {app}, run an update with --full-resync first")
+            return None
+        rules = self._rules.get(app_dir) or self._load_rules(app_dir)
+        known_urls = {asset['browser_download_url'] for release in releases for asset in release.get('assets', [])}
+        current = {v['url']: v for v in data.get('versions', [])}
+        # Keep what later stages added (sizes, digests, IPA metadata) for assets that are still selected
+        versions = [{**current[v['url']], 'version': v['version']} if v['url'] in current else v
+                    for v in self._select_versions(releases, rules, set()).values()]
+        # Versions the history never saw (added by hand or before it existed) cannot be re-derived; keep them
+        versions += [v for v in data.get('versions', []) if v['url'] not in known_urls]
+        return self._sort_versions(versions, rules)
+
+    def _sort_versions(self, versions: List[Dict], rules: ReleaseRules) -> List[Dict]:
+        """Newest first by release date, or by version key when the app's rules opt in."""
+        if rules.sort_by_version:
+            return sorted(versions, key=lambda v: (version_key(v['version']), v['date']),
+                          reverse=True)[:self.keep_versions]
+        return sorted(versions, key=lambda v: v['date'], reverse=True)[:self.keep_versions]
+
+    def _fetch_releases(self, repo: str, watermark: Optional[str]) -> List[Dict]:
+        """Return REST-shaped releases for a repo, newest first, down to the first page reaching the watermark."""
+        key = self._repo_key(repo)
+        if key in self._prefetched:
+            result = self._prefetched[key]
+        elif key in self._shared:
+            with self._fetch_lock:
+                repo_lock = self._repo_locks.setdefault(key, threading.Lock())
+            # The first app to get here fetches; the others wait and reuse its result
+            with repo_lock:
+                if key in self._fetched:
+                    METRICS.incr('shared_fetches_saved')
+                else:
+                    try:
+                        self._fetched[key] = self._fetch_rest(repo, self._shared[key])
+                    except RequestException as e:
+                        self._fetched[key] = e
+                result = self._fetched[key]
+        else:
+            return self._fetch_rest(repo, watermark)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _fetch_rest(self, repo: str, watermark: Optional[str]) -> List[Dict]:
+        slug = self._repo_slug(repo)
+        url = f'{self.api_url}/repos/{slug[0]}/{slug[1]}/releases?per_page=100'
+        releases = []
+        while url:
+            page, next_url = self._get_page(url)
+            releases.extend(page)
+            # Releases come newest first, so everything past the watermark was seen on an earlier run;
+            # unpublished drafts carry no date and say nothing about where the watermark is
+            reached_watermark = watermark and any(r.get('published_at') and r['published_at'] <= watermark
+                                                  for r in page)
+            url = None if reached_watermark else next_url
+        return releases
+
+    def _repo_slug(self, repo: str) -> Tuple[str, str]:
+        owner, repo_name = repo.rstrip('/').split('/')[-2:]
+        return owner, repo_name
+
+    def _repo_key(self, repo: str) -> Tuple[str, str]:
+        # GitHub owner and repo names are case-insensitive
+        owner, repo_name = self._repo_slug(repo)
+        return owner.lower(), repo_name.lower()
+
+    def _get_page(self, url: str) -> Tuple[List[Dict], Optional[str]]:
+        """GET one page of JSON, revalidating against the on-disk cache when enabled."""
+        entry = self.cache.get(url) if self.cache else None
+        request_headers = self.cache.conditional_headers(entry) if entry else {}
+        response = self.scheduler.get(url, headers=request_headers, timeout=10)
+        if response.status_code == 304 and entry:
+            METRICS.incr('cache_hits')
+            self.cache.touch(url)
+            return json.loads(entry['body']), entry.get('next')
+        if self.cache:
+            METRICS.incr('cache_misses')
+        response.raise_for_status()
+        next_url = response.links.get('next', {}).get('url')
+        if self.cache:
+            self.cache.store(url, response, next_url)
+        return response.json(), next_url
+
+    def _load_watermarks(self, app_dir: str) -> Dict:
+        """Load the newest published_at seen per repo on previous runs."""
+        path = os.path.join(app_dir, '.watermarks.json')
+        try:
+            watermarks = self.store.load(path)
+            # A copy, so a failed fetch never leaves advanced watermarks in the shared document
+            return dict(watermarks) if isinstance(watermarks, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, IOError) as e:
+            self.logger.warning(f"Ignoring unreadable watermarks for {os.path.basename(app_dir)}: {str(e)}")
+            return {}
+
+    def _save_watermarks(self, app_dir: str, watermarks: Dict):
+        path = os.path.join(app_dir, '.watermarks.json')
+        if not watermarks:
+            self.store.delete(path)
+            return
+        self._save_config(path, watermarks)
+
+    def _is_preferred_asset(self, new: Dict, current: Dict, rules: ReleaseRules) -> bool:
+        new_priority = rules.extension_priority(new['url'])
+        current_priority = rules.extension_priority(current['url'])
         if new_priority < current_priority:
             return True
         if new_priority == current_priority and new['size'] > current['size']:
             return True
         return False
 
-    def _load_rules(self, app_dir: str) -> Dict:
+    def _compile_rules(self, apps: List[Tuple[str, str]]):
+        """Validate and compile every app's rules before any release is fetched."""
+        self._rules, errors = {}, []
+        for app, config_path in apps:
+            app_dir = os.path.dirname(config_path)
+            try:
+                self._rules[app_dir] = self._load_rules(app_dir)
+            except RulesError as e:
+                errors.append(f"{app}: {str(e)}")
+        if errors:
+            for error in errors:
+                self.logger.error(f"Invalid rules file for {error}")
+            raise RulesError(f"{len(errors)} invalid rules file(s)")
+
+    def _load_rules(self, app_dir: str) -> ReleaseRules:
         rules_path = os.path.join(app_dir, '.rules.yaml')
         if not os.path.exists(rules_path):
             template = {
@@ -162,41 +511,11 @@ class VersionManager:
                 self.logger.info(f"Created template rules file for {os.path.basename(app_dir)}")
             except (IOError, PermissionError) as e:
                 self.logger.error(f"Failed to create rules template for {os.path.basename(app_dir)}: {str(e)}")
-            return {}
-        
-        try:
-            with open(rules_path, 'r') as f:
-                rules = yaml.safe_load(f) or {}
-            return rules if isinstance(rules, dict) else {}
-        except (yaml.YAMLError, IOError) as e:
-            self.logger.error(f"Failed to load rules for {os.path.basename(app_dir)}: {str(e)}")
-            return {}
+            return ReleaseRules()
+        return load_rules(rules_path)
 
-    def _should_include_asset(self, asset: Dict, rules: Dict) -> bool:
-        name = asset['name'].lower()
-        if rules.get('excluded_extensions') and any(name.endswith(ext) for ext in rules['excluded_extensions']):
-            return False
-        if rules.get('preferred_extensions'):
-            return any(name.endswith(ext) for ext in rules['preferred_extensions'])
-        return name.endswith(('.tipa', '.ipa'))
-
-    def _format_version_number(self, version: str, rules: Dict) -> str:
-        if rules.get('strip_v_prefix', False) and version.lower().startswith('v'):
-            version = version[1:]
-        if rules.get('remove_chars'):
-            for char in rules['remove_chars']:
-                version = version.replace(char, '')
-        if rules.get('replace_chars'):
-            for char, replacement in rules['replace_chars'].items():
-                version = version.replace(char, replacement)
-        return version.strip()
-
-    def _save_config(self, path: str, data: Dict):
-        try:
-            with open(path, 'w') as f:
-                json.dump(data, f, indent=4)
-        except (IOError, PermissionError) as e:
-            self.logger.error(f"Failed to save config {path}: {str(e)}")
+    def _save_config(self, path: str, data: Dict) -> bool:
+        return self.store.save(path, data)
 
     def _valid_repo(self, repo) -> bool:
         if not repo:
@@ -222,15 +541,44 @@ def int_or_float_to_int(value: str) -> int:
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Manage app versions")
-    parser.add_argument("action", choices=["update", "remove"], help="Action to perform")
+    parser.add_argument("action", choices=["update", "remove", "check", "inspect", "hash", "rederive"], help="Action to perform")
     parser.add_argument("--keep", type=int_or_float_to_int, default=10, help="Number of versions to keep")
     parser.add_argument("--apps", type=str, help="Comma-separated list of app names")
+    parser.add_argument("--workers", type=int, default=8, help="Maximum number of apps fetched concurrently")
+    parser.add_argument("--full-resync", action="store_true", help="Ignore per-repo watermarks and page through every release")
+    parser.add_argument("--backend", choices=["rest", "graphql"], default="rest", help="API used to discover releases")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk API, link, IPA and digest caches")
+    parser.add_argument("--cache-max-mb", type=int, default=64, help="Maximum size of the API response cache in MB")
+    parser.add_argument("--drop-dead", action="store_true", help="With check, remove versions whose download is gone")
+    parser.add_argument("--history-db", type=str, help="Release history database (default: .cache/releases.db)")
+    parser.add_argument("--no-history", action="store_true", help="Do not record fetched releases")
+    parser.add_argument("--hash-workers", type=int, default=4, help="Concurrent downloads when hashing assets")
+    parser.add_argument("--link-ttl-hours", type=float, default=168, help="How long a checked link is trusted")
+    parser.add_argument("--metrics-out", type=str, help="Write a JSON metrics report to this path")
+    parser.add_argument("--profile", type=str, help="Run under cProfile and dump stats to this path")
     args = parser.parse_args()
 
     logging.basicConfig(level=logging.INFO)
     current_dir = os.path.dirname(os.path.abspath(__file__))
     apps_dir = os.path.join(current_dir, "..", "Apps")
-    manager = VersionManager(apps_dir)
-    targets = args.apps.split(",") if args.apps else [None]
-    for target in targets:
-        manager.manage(args.action, target.strip() if target else None, args.keep)
\ No newline at end of file
+    cache_dir = None if args.no_cache else os.path.join(current_dir, "..", ".cache", "http")
+    link_cache = None if args.no_cache else os.path.join(current_dir, "..", ".cache", "links.json")
+    ipa_cache = None if args.no_cache else os.path.join(current_dir, "..", ".cache", "ipa_metadata.json")
+    digest_cache = None if args.no_cache else os.path.join(current_dir, "..", ".cache", "sha256.json")
+    history_db = None if args.no_history else args.history_db or os.path.join(current_dir, "..", ".cache", "releases.db")
+    manager = VersionManager(apps_dir, workers=args.workers, cache_dir=cache_dir,
+                             cache_max_bytes=args.cache_max_mb * 1024 * 1024, full_resync=args.full_resync,
+                             backend=args.backend, link_cache=link_cache, link_ttl=args.link_ttl_hours * 3600,
+                             drop_dead=args.drop_dead, ipa_cache=ipa_cache, digest_cache=digest_cache,
+                             hash_workers=args.hash_workers, history_db=history_db)
+    targets = [target.strip() for target in args.apps.split(",") if target.strip()] if args.apps else None
+
+    def run():
+        # One call for all targets, so the catalog is listed once and shared repos are fetched once
+        manager.manage(args.action, targets, args.keep)
+
+    try:
+        run_instrumented("manage_versions", run, args.metrics_out, args.profile)
+    except RulesError as e:
+        logging.getLogger("VersionManager").error(f"Aborting: {str(e)}")
+        sys.exit(1)
\ No newline at end of file
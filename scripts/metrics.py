@@ -0,0 +1,91 @@
+import cProfile
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+class Metrics:
+    """Thread-safe run metrics: stage timings, per-app timings and named counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = datetime.now(timezone.utc)
+            self.stages: Dict[str, float] = defaultdict(float)
+            self.apps: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+            self.counters: Dict[str, int] = defaultdict(int)
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def merge_counters(self, counters: Dict[str, int]):
+        """Fold in counters collected by a worker process."""
+        with self._lock:
+            for name, value in counters.items():
+                self.counters[name] += value
+
+    def take_counters(self) -> Dict[str, int]:
+        """Return and clear the counters, for shipping from a worker process to the parent."""
+        with self._lock:
+            counters, self.counters = dict(self.counters), defaultdict(int)
+            return counters
+
+    def record(self, stage: str, seconds: float, app: Optional[str] = None):
+        with self._lock:
+            if app is None:
+                self.stages[stage] += seconds
+            else:
+                self.apps[app][stage] += seconds
+
+    @contextmanager
+    def timer(self, stage: str, app: Optional[str] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, app)
+
+    def report(self, script: str) -> Dict:
+        with self._lock:
+            return {
+                'script': script,
+                'started': self.started.isoformat(timespec='seconds'),
+                'wall_seconds': round((datetime.now(timezone.utc) - self.started).total_seconds(), 4),
+                'stages': {k: round(v, 4) for k, v in self.stages.items()},
+                'apps': {app: {k: round(v, 4) for k, v in stages.items()} for app, stages in sorted(self.apps.items())},
+                'counters': dict(sorted(self.counters.items()))
+            }
+
+# Process-wide instance shared by the HTTP, asset and feed layers
+METRICS = Metrics()
+
+def run_instrumented(script: str, func: Callable, metrics_out: Optional[str] = None,
+                     profile_out: Optional[str] = None):
+    """Run a script body, optionally under cProfile, and write its metrics report."""
+    logger = logging.getLogger("Metrics")
+    METRICS.reset()
+    profiler = cProfile.Profile() if profile_out else None
+    if profiler:
+        profiler.enable()
+    try:
+        with METRICS.timer('total'):
+            return func()
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_out)
+            logger.info(f"Wrote profile to {profile_out}")
+        if metrics_out:
+            os.makedirs(os.path.dirname(os.path.abspath(metrics_out)), exist_ok=True)
+            with open(metrics_out, 'w') as f:
+                json.dump(METRICS.report(script), f, indent=2)
+            logger.info(f"Wrote metrics to {metrics_out}")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Set
+from app_store import AppStore
+from metrics import METRICS, run_instrumented
+
+STAGES = ('versions', 'assets', 'compile')
+# Nightly version work: new releases first, then links, IPA metadata and digests of what they added
+VERSION_ACTIONS = ('update', 'check', 'inspect', 'hash')
+
+class PipelineError(Exception):
+    """A stage failed in a way that should fail the whole run."""
+
+class Pipeline:
+    """Runs the versions, assets and compile stages in one process over one shared AppStore.
+
+    Each stage reports the apps whose app.json it rewrote. Compile is skipped when the stages
+    run before it changed no app, and every subsystem (requests/yaml, PIL) is only imported once its stage runs.
+    """
+
+    def __init__(self, root_dir: str, stages: Iterable[str] = STAGES, targets: Optional[List[str]] = None,
+                 keep: int = 10, workers: int = 8, backend: str = 'rest', full_resync: bool = False,
+                 use_cache: bool = True, history: bool = True, drop_dead: bool = False,
+                 asset_workers: Optional[int] = None, always_compile: bool = False,
+                 compile_options: Optional[Dict] = None):
+        stages = list(stages)
+        unknown = [stage for stage in stages if stage not in STAGES]
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(unknown)}")
+        self.root_dir = os.path.abspath(root_dir)
+        self.apps_dir = os.path.join(self.root_dir, 'Apps')
+        self.cache_dir = os.path.join(self.root_dir, '.cache')
+        self.stages = [stage for stage in STAGES if stage in stages]
+        self.targets = targets
+        self.keep = keep
+        self.workers = workers
+        self.backend = backend
+        self.full_resync = full_resync
+        self.use_cache = use_cache
+        self.history = history
+        self.drop_dead = drop_dead
+        self.asset_workers = asset_workers
+        self.always_compile = always_compile
+        self.compile_options = compile_options or {}
+        self.store = AppStore()
+        self.logger = logging.getLogger("Pipeline")
+
+    def run(self) -> Dict[str, Set[str]]:
+        """Run the selected stages in order and return the apps each one changed."""
+        changed: Dict[str, Set[str]] = {}
+        for stage in self.stages:
+            upstream = set().union(*changed.values())
+            # Compile on its own was asked for explicitly; only skip it behind stages that changed nothing
+            if stage == 'compile' and changed and not upstream and not self.always_compile:
+                self.logger.info("No app changed upstream, skipping compile")
+                METRICS.incr('stages_skipped')
+                continue
+            with METRICS.timer(stage):
+                getattr(self, f"_run_{stage}")()
+            changed[stage] = self._changed_apps()
+            self.logger.info(f"{stage} changed {len(changed[stage])} apps"
+                             + (f": {', '.join(sorted(changed[stage]))}" if changed[stage] else ""))
+        return changed
+
+    def _changed_apps(self) -> Set[str]:
+        # Sidecars (.watermarks.json, .assets.json) never reach the feeds, only app.json does
+        return {os.path.basename(os.path.dirname(path)) for path in self.store.take_written()
+                if os.path.basename(path) == 'app.json'}
+
+    def _cache_path(self, name: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, name) if self.use_cache else None
+
+    def _run_versions(self):
+        from manage_versions import VersionManager
+        from release_rules import RulesError
+
+        manager = VersionManager(self.apps_dir, workers=self.workers, cache_dir=self._cache_path('http'),
+                                 full_resync=self.full_resync, backend=self.backend,
+                                 store=self.store, link_cache=self._cache_path('links.json'),
+                                 drop_dead=self.drop_dead, ipa_cache=self._cache_path('ipa_metadata.json'),
+                                 digest_cache=self._cache_path('sha256.json'),
+                                 history_db=os.path.join(self.cache_dir, 'releases.db') if self.history else None)
+        # The catalog is shared across actions, so Apps/ is listed once for the whole stage
+        try:
+            for action in VERSION_ACTIONS:
+                with METRICS.timer(f"versions.{action}"):
+                    manager.manage(action, self.targets, self.keep)
+        except RulesError as e:
+            raise PipelineError(str(e)) from e
+        finally:
+            if manager.history:
+                manager.history.close()
+
+    def _run_assets(self):
+        # Assets come from committed images rather than from versions, so every target is considered;
+        # the per-app asset manifest keeps unchanged images cheap
+        from manage_assets import AssetManager
+
+        manager = AssetManager(self.apps_dir, workers=self.asset_workers, store=self.store)
+        manager.manage_icons(self.targets)
+
+    def _run_compile(self):
+        from compile_repository import RepoCompiler
+
+        compiler = RepoCompiler(root_dir=self.root_dir, output_dir=self.root_dir, store=self.store,
+                                **self.compile_options)
+        # Unchanged apps reuse their rendered entries from the compile manifest
+        result = compiler.compile_repos()
+        if not result['success']:
+            raise PipelineError(f"Compilation failed: {result['error']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the versions, assets and compile stages in one process")
+    parser.add_argument("--stages", type=str, default=",".join(STAGES),
+                        help=f"Comma-separated stages to run, in order (default: {','.join(STAGES)})")
+    parser.add_argument("--apps", type=str, help="Comma-separated list of app names")
+    parser.add_argument("--keep", type=int, default=10, help="Number of versions to keep")
+    parser.add_argument("--workers", type=int, default=8, help="Maximum number of apps fetched concurrently")
+    parser.add_argument("--backend", choices=["rest", "graphql"], default="rest", help="API used to discover releases")
+    parser.add_argument("--full-resync", action="store_true", help="Ignore per-repo watermarks and page through every release")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk API, link, IPA and digest caches")
+    parser.add_argument("--no-history", action="store_true", help="Do not record fetched releases")
+    parser.add_argument("--drop-dead", action="store_true", help="Remove versions whose download is gone")
+    parser.add_argument("--asset-workers", type=int, help="Number of image worker processes (default: CPU count)")
+    parser.add_argument("--always-compile", action="store_true", help="Compile even if no app changed upstream")
+    parser.add_argument("--force", action="store_true", help="Ignore the compile manifest and re-render every entry")
+    parser.add_argument("--minify", action="store_true", help="Also write minified .min.json variants")
+    parser.add_argument("--compress", action="store_true", help="Also write precompressed .gz/.br variants")
+    parser.add_argument("--index", action="store_true", help="Also write per-app shards and an index.json of their hashes")
+    parser.add_argument("--tier", type=int, help="Keep only the latest N versions per app in the feeds")
+    parser.add_argument("--metrics-out", type=str, help="Write a JSON metrics report to this path")
+    parser.add_argument("--profile", type=str, help="Run under cProfile and dump stats to this path")
+    args = parser.parse_args()
+    if args.asset_workers is not None and args.asset_workers < 1:
+        parser.error("--asset-workers must be a positive integer")
+
+    logging.basicConfig(level=logging.INFO)
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    targets = [target.strip() for target in args.apps.split(",") if target.strip()] if args.apps else None
+    pipeline = Pipeline(os.path.join(current_dir, ".."),
+                        stages=[stage.strip() for stage in args.stages.split(",") if stage.strip()],
+                        targets=targets, keep=args.keep, workers=args.workers, backend=args.backend,
+                        full_resync=args.full_resync, use_cache=not args.no_cache, history=not args.no_history,
+                        drop_dead=args.drop_dead, asset_workers=args.asset_workers,
+                        always_compile=args.always_compile or args.force,
+                        compile_options={'force': args.force, 'minify': args.minify, 'compress': args.compress,
+                                         'index': args.index, 'tier_versions': args.tier})
+
+    try:
+        run_instrumented("pipeline", pipeline.run, args.metrics_out, args.profile)
+    except PipelineError as e:
+        logging.getLogger("Pipeline").error(f"Aborting: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (
+    repo TEXT NOT NULL,
+    tag_name TEXT NOT NULL,
+    release_id INTEGER,
+    published_at TEXT,
+    PRIMARY KEY (repo, tag_name)
+);
+CREATE TABLE IF NOT EXISTS assets (
+    repo TEXT NOT NULL,
+    tag_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER,
+    url TEXT NOT NULL,
+    PRIMARY KEY (repo, tag_name, name)
+);
+"""
+
+class ReleaseHistory:
+    """SQLite store of every release and asset seen per repository, so versions can be re-derived offline."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        # One connection shared by the fetch threads; every use goes through the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def record(self, repo: str, releases: List[Dict]):
+        """Upsert REST-shaped releases for a repo URL."""
+        release_rows, asset_rows = [], []
+        for release in releases:
+            tag = release.get('tag_name')
+            if not tag:
+                continue
+            release_rows.append((repo, tag, release.get('id'), release.get('published_at')))
+            asset_rows.extend((repo, tag, asset['name'], asset.get('size'), asset['browser_download_url'])
+                              for asset in release.get('assets', []))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO releases (repo, tag_name, release_id, published_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (repo, tag_name) DO UPDATE SET release_id = excluded.release_id, "
+                "published_at = excluded.published_at", release_rows)
+            self._conn.executemany(
+                "INSERT INTO assets (repo, tag_name, name, size, url) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (repo, tag_name, name) DO UPDATE SET size = excluded.size, url = excluded.url",
+                asset_rows)
+
+    def releases(self, repo: str) -> List[Dict]:
+        """Stored releases for a repo URL in the REST shape, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.tag_name, r.release_id, r.published_at, a.name, a.size, a.url FROM releases r "
+                "LEFT JOIN assets a ON a.repo = r.repo AND a.tag_name = r.tag_name "
+                "WHERE r.repo = ? ORDER BY r.published_at DESC, r.tag_name, a.name", (repo,)).fetchall()
+        releases: Dict[str, Dict] = {}
+        for tag, release_id, published_at, name, size, url in rows:
+            release = releases.setdefault(tag, {'id': release_id, 'tag_name': tag,
+                                                'published_at': published_at, 'assets': []})
+            if name is not None:
+                release['assets'].append({'name': name, 'size': size, 'browser_download_url': url})
+        return list(releases.values())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,109 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+import yaml
+
+DEFAULT_EXTENSIONS = ('.tipa', '.ipa')
+# Key -> accepted type; list/dict values must hold strings
+RULE_TYPES = {
+    'preferred_extensions': list,
+    'excluded_extensions': list,
+    'exclude_patterns': list,
+    'strip_v_prefix': bool,
+    'replace_chars': dict,
+    'remove_chars': list,
+    'sort_by_version': bool
+}
+_VERSION_TOKEN = re.compile(r'\d+|[a-z]+')
+
+class RulesError(ValueError):
+    """Raised for a .rules.yaml that cannot be parsed or has the wrong shape."""
+
+class ReleaseRules:
+    """An app's .rules.yaml compiled into matchers built once per run."""
+
+    def __init__(self, rules: Optional[Dict] = None):
+        rules = validate_rules(rules or {})
+        preferred = [ext.lower() for ext in rules.get('preferred_extensions') or []]
+        self.preferred_extensions: List[str] = preferred or list(DEFAULT_EXTENSIONS)
+        self._included = tuple(self.preferred_extensions)
+        self._excluded = tuple(ext.lower() for ext in rules.get('excluded_extensions') or [])
+        patterns = rules.get('exclude_patterns') or []
+        # One alternation instead of a substring scan per pattern
+        self._exclude = re.compile('|'.join(re.escape(p) for p in patterns), re.IGNORECASE) if patterns else None
+        self._strip_v = rules.get('strip_v_prefix', False)
+        # Opt-in: tags don't reliably encode release order (nightlies, build numbers, restarted schemes)
+        self.sort_by_version: bool = rules.get('sort_by_version') or False
+        # Applied in order: removals, then replacements, as before
+        self._substitutions: Tuple[Tuple[str, str], ...] = tuple(
+            [(chars, '') for chars in rules.get('remove_chars') or []]
+            + list((rules.get('replace_chars') or {}).items()))
+
+    def include_asset(self, name: str) -> bool:
+        name = name.lower()
+        if self._excluded and name.endswith(self._excluded):
+            return False
+        return name.endswith(self._included)
+
+    def format_version(self, tag: str) -> str:
+        if self._strip_v and tag[:1] in ('v', 'V'):
+            tag = tag[1:]
+        for old, new in self._substitutions:
+            tag = tag.replace(old, new)
+        return tag.strip()
+
+    def excluded_version(self, version: str) -> bool:
+        return bool(self._exclude and self._exclude.search(version))
+
+    def extension_priority(self, url: str) -> int:
+        """Index of the URL's extension in preferred_extensions; unlisted extensions rank last."""
+        ext = os.path.splitext(url)[1].lower()
+        try:
+            return self.preferred_extensions.index(ext)
+        except ValueError:
+            return len(self.preferred_extensions)
+
+def validate_rules(rules) -> Dict:
+    """Check a parsed rules document and return it, raising RulesError on the first problem."""
+    if not isinstance(rules, dict):
+        raise RulesError(f"expected a mapping, got {type(rules).__name__}")
+    for key, value in rules.items():
+        expected = RULE_TYPES.get(key)
+        if expected is None:
+            raise RulesError(f"unknown key '{key}'")
+        if value is None:
+            continue
+        if not isinstance(value, expected):
+            raise RulesError(f"'{key}' must be a {expected.__name__}, got {type(value).__name__}")
+        if isinstance(value, bool):
+            continue
+        items = value.items() if isinstance(value, dict) else [(item, '') for item in value]
+        for item, replacement in items:
+            if not isinstance(item, str) or not isinstance(replacement, str):
+                raise RulesError(f"'{key}' must only contain strings, got {item!r}")
+            if not item:
+                raise RulesError(f"'{key}' contains an empty string")
+    return rules
+
+def load_rules(path: str) -> ReleaseRules:
+    """Parse, validate and compile a .rules.yaml file."""
+    try:
+        with open(path, 'r') as f:
+            rules = yaml.safe_load(f)
+    except (yaml.YAMLError, IOError) as e:
+        raise RulesError(str(e)) from e
+    return ReleaseRules(rules)
+
+def version_key(version: str) -> Tuple:
+    """Sort key ordering versions numerically, with pre-release suffixes before the release.
+
+    '1.10' > '1.9', '1.0' == '1.0.0', and '1.0' > '1.0rc2' > '1.0beta'.
+    """
+    tokens = _VERSION_TOKEN.findall(version.lower())
+    release = []
+    while tokens and tokens[0].isdigit():
+        release.append(int(tokens.pop(0)))
+    while release and release[-1] == 0:
+        release.pop()
+    suffix = tuple((1, int(t)) if t.isdigit() else (0, t) for t in tokens)
+    return tuple(release), (0, suffix) if suffix else (1, ())
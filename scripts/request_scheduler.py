@@ -0,0 +1,163 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+import requests
+from requests.exceptions import ConnectionError, RequestException, Timeout
+from metrics import METRICS
+
+class _TokenState:
+    def __init__(self, token: Optional[str]):
+        self.token = token
+        self.limit = None
+        self.remaining = None
+        self.reset = 0.0
+        self.next_allowed = 0.0
+        self.requests = 0
+
+class RequestScheduler:
+    """Paces GitHub API calls from rate-limit headers and retries transient failures with backoff."""
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, session: requests.Session, tokens: List[str], max_retries: int = 5,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, reserve: int = 100,
+                 max_wait: float = 900.0, name: str = "RequestScheduler"):
+        if not isinstance(max_retries, int) or max_retries < 0:
+            raise ValueError("max_retries must be a non-negative integer")
+        self.session = session
+        self.tokens = [t for t in tokens if t]
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.retries = 0
+        self.logger = logging.getLogger(name)
+        self._states = [_TokenState(t) for t in self.tokens] or [_TokenState(None)]
+        self._lock = threading.Lock()
+
+    def get(self, url: str, headers: Optional[Dict] = None, timeout: int = 10) -> requests.Response:
+        return self.request('GET', url, headers=headers, timeout=timeout)
+
+    def post(self, url: str, json: Optional[Dict] = None, headers: Optional[Dict] = None,
+             timeout: int = 30) -> requests.Response:
+        return self.request('POST', url, headers=headers, timeout=timeout, json=json)
+
+    def request(self, method: str, url: str, headers: Optional[Dict] = None, timeout: int = 10,
+                **kwargs) -> requests.Response:
+        """Send a request through the token pool, retrying 5xx/429/secondary-limit responses."""
+        for attempt in range(self.max_retries + 1):
+            state = self._acquire()
+            request_headers = dict(headers or {})
+            if state.token:
+                request_headers['Authorization'] = f'token {state.token}'
+            try:
+                response = self.session.request(method, url, headers=request_headers, timeout=timeout, **kwargs)
+            except (ConnectionError, Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                self._backoff(attempt, None, f"{type(e).__name__} for {url}")
+                continue
+
+            self._update(state, response)
+            METRICS.incr('http_requests')
+            if not kwargs.get('stream'):
+                # Streamed bodies are counted by whoever consumes them
+                METRICS.incr('http_bytes', len(response.content))
+            if response.status_code == 304:
+                METRICS.incr('http_not_modified')
+            if attempt == self.max_retries or not self._should_retry(response):
+                return response
+            # Hand the connection back to the pool; an unread streamed body would otherwise hold it
+            response.close()
+            self._backoff(attempt, response, f"HTTP {response.status_code} for {url}")
+        raise RequestException(f"Retries exhausted for {url}")
+
+    def budget(self) -> List[Dict]:
+        """Return the last known rate-limit budget for every token in the pool."""
+        with self._lock:
+            return [{
+                'token': f"#{i + 1}",
+                'requests': s.requests,
+                'limit': s.limit,
+                'remaining': s.remaining,
+                'reset': time.strftime('%H:%M:%S', time.gmtime(s.reset)) if s.reset else None
+            } for i, s in enumerate(self._states)]
+
+    def log_report(self):
+        for entry in self.budget():
+            self.logger.info(f"Token {entry['token']}: {entry['requests']} requests, "
+                             f"{entry['remaining']}/{entry['limit']} remaining, resets at {entry['reset']} UTC")
+        self.logger.info(f"Retried {self.retries} requests")
+
+    def _acquire(self) -> _TokenState:
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.time()
+                for s in self._states:
+                    if s.remaining is not None and s.remaining <= 0 and now >= s.reset:
+                        s.remaining = None  # Window rolled over, budget unknown until the next response
+                usable = [s for s in self._states if s.remaining is None or s.remaining > 0]
+                if usable:
+                    state = max(usable, key=lambda s: float('inf') if s.remaining is None else s.remaining)
+                    wait = state.next_allowed - now
+                    if wait <= 0:
+                        state.requests += 1
+                        if state.remaining is not None:
+                            state.remaining -= 1
+                            if state.remaining < self.reserve:
+                                # Running low: spread what is left evenly over the rest of the window
+                                state.next_allowed = now + max(0.0, state.reset - now) / max(1, state.remaining)
+                        return state
+                else:
+                    wait = min(s.reset for s in self._states) - now
+
+            if waited + wait > self.max_wait:
+                raise RequestException(f"Rate limit exhausted, next reset in {int(wait)}s")
+            wait = max(wait, 0.05)
+            time.sleep(wait)
+            waited += wait
+
+    def _update(self, state: _TokenState, response: requests.Response):
+        headers = response.headers
+        with self._lock:
+            try:
+                if 'X-RateLimit-Limit' in headers:
+                    state.limit = int(headers['X-RateLimit-Limit'])
+                if 'X-RateLimit-Remaining' in headers:
+                    state.remaining = int(headers['X-RateLimit-Remaining'])
+                if 'X-RateLimit-Reset' in headers:
+                    state.reset = float(headers['X-RateLimit-Reset'])
+            except ValueError:
+                self.logger.warning(f"Ignoring malformed rate-limit headers from {response.url}")
+
+    def _should_retry(self, response: requests.Response) -> bool:
+        if response.status_code in self.RETRY_STATUSES:
+            return True
+        if response.status_code == 403:
+            if response.headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in response.headers:
+                return True
+            text = response.text.lower()
+            return 'secondary rate limit' in text or 'abuse' in text
+        return False
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response], reason: str):
+        with self._lock:
+            self.retries += 1
+        METRICS.incr('http_retries')
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+            # Same bound as _acquire: give up rather than park a worker for an hour-long secondary limit
+            if delay > self.max_wait:
+                raise RequestException(f"{reason}, Retry-After of {int(delay)}s exceeds max_wait")
+        elif response is not None and response.headers.get('X-RateLimit-Remaining') == '0':
+            delay = 0.0  # _acquire waits for the reset or rotates to another token
+        else:
+            # Full jitter keeps concurrent workers from retrying in lockstep
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        self.logger.warning(f"{reason}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+        time.sleep(delay)
@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+class URLCache:
+    """Small persistent map of per-URL results, stored as one JSON file and saved once per run.
+
+    Entries are stamped when written; with a ttl, older entries read as missing so callers revalidate them.
+    Without a path the cache lives only for the run.
+    """
+
+    def __init__(self, path: Optional[str], ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        self.logger = logging.getLogger("URLCache")
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, Dict] = {}
+        if not path:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            if isinstance(entries, dict):
+                self._entries = entries
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, IOError) as e:
+            self.logger.warning(f"Discarding unreadable cache {path}: {str(e)}")
+
+    @staticmethod
+    def key(url: str, size: Optional[int] = None) -> str:
+        """Cache key for results that depend on the exact asset, not just its URL."""
+        return url if size is None else f"{url}#{size}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or (self.ttl is not None and time.time() - entry.get('checked', 0) > self.ttl):
+            return None
+        return entry
+
+    def put(self, key: str, entry: Dict):
+        with self._lock:
+            self._entries[key] = {**entry, 'checked': int(time.time())}
+            self._dirty = True
+
+    def save(self):
+        """Write the cache if anything changed, dropping entries that have outlived the ttl."""
+        with self._lock:
+            if not self._dirty or not self.path:
+                return
+            if self.ttl is not None:
+                cutoff = time.time() - self.ttl
+                self._entries = {k: v for k, v in self._entries.items() if v.get('checked', 0) >= cutoff}
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except (IOError, OSError) as e:
+                self.logger.warning(f"Failed to write cache {self.path}: {str(e)}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
@@ -0,0 +1,67 @@
+import functools
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import io
+import os
+import re
+import sys
+import threading
+import pytest
+
+# The scripts import each other as siblings, the way they run from the command line
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+sys.path.insert(0, os.path.abspath(SCRIPTS_DIR))
+sys.path.insert(0, os.path.abspath(os.path.join(SCRIPTS_DIR, '..', 'benchmarks')))
+
+class RangeHandler(SimpleHTTPRequestHandler):
+    """Static file server that honours single byte ranges, like a CDN would."""
+
+    ranges = True
+    # Set to answer every HEAD with this status, like signed asset storage does
+    head_status = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        if self.head_status:
+            self.send_response(self.head_status)
+            self.end_headers()
+            return
+        super().do_HEAD()
+
+    def send_head(self):
+        match = re.fullmatch(r'bytes=(-?\d+)-?(\d*)', self.headers.get('Range', ''))
+        path = self.translate_path(self.path)
+        if not self.ranges or not match or not os.path.isfile(path):
+            return super().send_head()
+        with open(path, 'rb') as f:
+            body = f.read()
+        start = int(match.group(1))
+        start, end = (max(len(body) + start, 0), len(body) - 1) if start < 0 else (start, int(match.group(2) or len(body) - 1))
+        end = min(end, len(body) - 1)
+        if start > end:
+            self.send_response(416)
+            self.end_headers()
+            return None
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        return io.BytesIO(body[start:end + 1])
+
+@pytest.fixture
+def static_server():
+    """Start a static file server for a directory, with or without Range support; returns its base URL."""
+    servers = []
+
+    def start(directory, ranges: bool = True, head_status=None) -> str:
+        handler = type('Handler', (RangeHandler,), {'ranges': ranges, 'head_status': head_status})
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(handler, directory=str(directory)))
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return f"http://127.0.0.1:{httpd.server_port}"
+
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
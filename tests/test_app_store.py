@@ -0,0 +1,67 @@
+import hashlib
+import json
+import pytest
+from app_store import AppStore
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / 'app.json'
+    path.write_text(json.dumps({'name': 'Alpha', 'subtitle': 'Old', 'versions': [{'version': '1.0'}]}, indent=4))
+    return path
+
+def rewrite(path, **fields):
+    # Another job saving its own change between our load() and save()
+    path.write_text(json.dumps({**json.loads(path.read_text()), **fields}, indent=4))
+
+def test_clean_document_is_not_written(config):
+    store = AppStore()
+    data = store.load(str(config))
+    before = config.stat().st_mtime_ns
+    assert store.save(str(config), data)
+    assert config.stat().st_mtime_ns == before and store.take_written() == set()
+
+def test_clean_document_does_not_clobber_a_concurrent_write(config):
+    store = AppStore()
+    data = store.load(str(config))
+    rewrite(config, subtitle='Theirs')
+    assert store.save(str(config), data)
+    assert json.loads(config.read_text())['subtitle'] == 'Theirs'
+
+def test_concurrent_writers_keep_both_sets_of_fields(config):
+    versions_job, assets_job = AppStore(), AppStore()
+    versions = versions_job.load(str(config))
+    assets = assets_job.load(str(config))
+    versions['versions'].insert(0, {'version': '2.0'})
+    assets['icon'] = 'icon.png'
+    assets['subtitle'] = 'New'
+    assert assets_job.save(str(config), assets)
+    assert versions_job.save(str(config), versions)
+    on_disk = json.loads(config.read_text())
+    assert on_disk['versions'] == [{'version': '2.0'}, {'version': '1.0'}]
+    assert on_disk['icon'] == 'icon.png' and on_disk['subtitle'] == 'New'
+    # The working document now reflects what was written
+    assert versions == on_disk
+
+def test_removed_field_stays_removed_after_merge(config):
+    store = AppStore()
+    data = store.load(str(config))
+    del data['subtitle']
+    rewrite(config, description='Theirs')
+    assert store.save(str(config), data)
+    on_disk = json.loads(config.read_text())
+    assert 'subtitle' not in on_disk and on_disk['description'] == 'Theirs'
+
+def test_save_refreshes_digest_and_snapshot(config):
+    store = AppStore()
+    data = store.load(str(config))
+    data['subtitle'] = 'New'
+    assert store.save(str(config), data)
+    assert store.digest(str(config)) == hashlib.sha256(config.read_bytes()).hexdigest()
+    assert store.dirty_fields(str(config), data) == set()
+    assert store.take_written() == {str(config)}
+    # Our own write is not mistaken for someone else's, and a later outside write still is
+    rewrite(config, description='Theirs')
+    data['category'] = 'Utilities'
+    assert store.save(str(config), data)
+    on_disk = json.loads(config.read_text())
+    assert on_disk['subtitle'] == 'New' and on_disk['description'] == 'Theirs' and on_disk['category'] == 'Utilities'
@@ -0,0 +1,84 @@
+import json
+import shutil
+import time
+import pytest
+import feed_writer
+from compile_repository import RepoCompiler
+from feed_formats import FORMATS
+
+REPO_INFO = {'name': 'Test Repo', 'iconURL': 'https://example.com/icon.png'}
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'repo-info.json').write_text(json.dumps(REPO_INFO))
+    for name in ('Alpha', 'Beta'):
+        app_dir = tmp_path / 'Apps' / name
+        app_dir.mkdir(parents=True)
+        (app_dir / 'app.json').write_text(json.dumps({
+            'name': name, 'bundleID': f'com.example.{name.lower()}',
+            'versions': [{'version': '1.0', 'date': '2025-01-01', 'url': f'https://example.com/{name}.ipa', 'size': 1}]}))
+    return tmp_path
+
+def compile_repo(root, **kwargs):
+    result = RepoCompiler(root_dir=str(root), output_dir=str(root), **kwargs).compile_repos(['altstore'])
+    assert result['success']
+    return result
+
+def manifest(root):
+    return json.loads((root / '.cache' / 'compile' / 'manifest.json').read_text())
+
+def test_writer_change_invalidates_current_outputs(root, tmp_path_factory, monkeypatch):
+    compile_repo(root)
+    before = manifest(root)['renderer']
+    changed_writer = tmp_path_factory.mktemp('writer') / 'feed_writer.py'
+    changed_writer.write_bytes(open(feed_writer.__file__, 'rb').read() + b'\n# new output format\n')
+    monkeypatch.setattr(feed_writer, '__file__', str(changed_writer))
+    # Output is byte-identical, so only the renderer identity can tell that it must be rewritten
+    compile_repo(root)
+    assert manifest(root)['renderer'] != before
+
+def test_manifest_keeps_digests_and_entries_live_on_disk(root):
+    compile_repo(root, index=True)
+    entries = manifest(root)['entries']['altstore']
+    assert sorted(entries) == ['Alpha', 'Beta'] and all('entry' not in cached for cached in entries.values())
+    # Shards are served straight from the cached entries
+    shard = (root / 'shards' / 'altstore' / 'Alpha.json').read_bytes()
+    assert shard == (root / '.cache' / 'compile' / 'entries' / 'altstore' / 'Alpha.json').read_bytes()
+    assert json.loads(shard)['name'] == 'Alpha'
+
+def test_unchanged_entries_are_reused_from_disk(root, monkeypatch):
+    compile_repo(root)
+    expected = (root / 'altstore.json').read_text()
+    config = json.loads((root / 'Apps' / 'Beta' / 'app.json').read_text())
+    (root / 'Apps' / 'Beta' / 'app.json').write_text(json.dumps({**config, 'subtitle': 'Changed'}))
+    rendered = []
+    entry = FORMATS['altstore'].entry
+    monkeypatch.setattr(FORMATS['altstore'], 'entry', lambda record: rendered.append(record['name']) or entry(record))
+    compile_repo(root)
+    assert rendered == ['Beta']
+    assert json.loads((root / 'altstore.json').read_text())['apps'][1]['subtitle'] == 'Changed'
+    assert (root / 'altstore.json').read_text().replace('"Changed"', '""') == expected
+
+def test_damaged_or_missing_entries_are_rendered_again(root):
+    compile_repo(root)
+    expected = (root / 'altstore.json').read_text()
+    entries_dir = root / '.cache' / 'compile' / 'entries' / 'altstore'
+    (entries_dir / 'Alpha.json').write_text('{"name": "Stale"}')
+    (entries_dir / 'Beta.json').unlink()
+    (root / 'altstore.json').unlink()
+    compile_repo(root)
+    assert (root / 'altstore.json').read_text() == expected
+    assert json.loads((entries_dir / 'Alpha.json').read_text())['name'] == 'Alpha'
+
+def test_entries_of_removed_apps_are_pruned(root):
+    compile_repo(root)
+    shutil.rmtree(root / 'Apps' / 'Beta')
+    compile_repo(root)
+    assert [p.name for p in (root / '.cache' / 'compile' / 'entries' / 'altstore').iterdir()] == ['Alpha.json']
+    assert sorted(manifest(root)['entries']['altstore']) == ['Alpha']
+
+def test_lazily_rendered_entries_count_as_render_time(root, monkeypatch):
+    entry = FORMATS['altstore'].entry
+    monkeypatch.setattr(FORMATS['altstore'], 'entry', lambda record: time.sleep(0.1) or entry(record))
+    timings = compile_repo(root)['timings']['altstore']
+    assert timings['render'] >= 0.2 and timings['write'] < 0.1
@@ -0,0 +1,17 @@
+import json
+import pytest
+from feed_writer import FeedWriter
+
+def test_write_matches_json_dumps(tmp_path):
+    data = {'name': 'Repo', 'apps': iter([{'name': 'Alpha', 'versions': []}, {'name': 'Beta'}]), 'news': []}
+    FeedWriter(minify=True).write(tmp_path / 'feed.json', data)
+    expected = {'name': 'Repo', 'apps': [{'name': 'Alpha', 'versions': []}, {'name': 'Beta'}], 'news': []}
+    assert (tmp_path / 'feed.json').read_text() == json.dumps(expected, indent=2, ensure_ascii=False)
+    assert json.loads((tmp_path / 'feed.min.json').read_text()) == expected
+
+def test_failed_write_leaves_no_temp_files(tmp_path):
+    (tmp_path / 'feed.json').write_text('{}')
+    with pytest.raises(TypeError):
+        FeedWriter(minify=True, compress=True).write(tmp_path / 'feed.json', {'apps': iter([{'bad': object()}])})
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['feed.json']
+    assert (tmp_path / 'feed.json').read_text() == '{}'
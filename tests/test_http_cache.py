@@ -0,0 +1,22 @@
+import os
+import pytest
+from http_cache import HTTPCache
+
+class FakeResponse:
+    def __init__(self, text):
+        self.headers = {'ETag': '"abc"'}
+        self.text = text
+
+def test_store_and_get_round_trip(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store('https://api.github.com/repos/o/r/releases', FakeResponse('[]'), next_url='https://next')
+    entry = cache.get('https://api.github.com/repos/o/r/releases')
+    assert entry['body'] == '[]' and entry['etag'] == '"abc"' and entry['next'] == 'https://next'
+    assert cache.conditional_headers(entry) == {'If-None-Match': '"abc"'}
+
+def test_failed_store_leaves_no_temp_file(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    # Not JSON serializable, so json.dump fails halfway through the temp file
+    with pytest.raises(TypeError):
+        cache.store('https://api.github.com/repos/o/r/releases', FakeResponse(object()))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,57 @@
+import io
+import os
+import plistlib
+import struct
+import zipfile
+import pytest
+import requests
+from ipa_metadata import IPAMetadataError, IPAMetadataExtractor
+from request_scheduler import RequestScheduler
+from url_cache import URLCache
+
+def build_ipa(padding: int = 256 * 1024) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        # Incompressible padding so the central directory lies outside the tail read
+        archive.writestr(zipfile.ZipInfo('Payload/App.app/App'), os.urandom(padding), zipfile.ZIP_STORED)
+        archive.writestr('Payload/App.app/Info.plist', plistlib.dumps({
+            'CFBundleIdentifier': 'com.example.app',
+            'CFBundleShortVersionString': '1.2.3',
+            'MinimumOSVersion': '15.0'
+        }))
+    return buffer.getvalue()
+
+def build_truncated_zip64() -> bytes:
+    # An EOCD that defers to a ZIP64 record which is cut short
+    record = b'PK\x06\x06'
+    locator = b'PK\x06\x07' + struct.pack('<IQI', 0, 0, 1)
+    eocd = b'PK\x05\x06' + struct.pack('<HHHHIIH', 0, 0, 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0)
+    return record + locator + eocd
+
+@pytest.fixture(params=['ranges', 'no-ranges'])
+def server(request, tmp_path, static_server):
+    ipa = build_ipa()
+    (tmp_path / 'valid.ipa').write_bytes(ipa)
+    (tmp_path / 'truncated.ipa').write_bytes(ipa[:len(ipa) // 2])
+    (tmp_path / 'zip64.ipa').write_bytes(build_truncated_zip64())
+    return static_server(tmp_path, ranges=request.param == 'ranges')
+
+@pytest.fixture
+def extractor(tmp_path):
+    scheduler = RequestScheduler(requests.Session(), [], max_retries=0, name="IPAScheduler")
+    return IPAMetadataExtractor(scheduler, URLCache(str(tmp_path / 'ipa_metadata.json')), workers=2)
+
+def test_extracts_valid_ipa(server, extractor):
+    assert extractor.extract(f"{server}/valid.ipa") == {
+        'bundleID': 'com.example.app', 'version': '1.2.3', 'minOSVersion': '15.0'}
+
+@pytest.mark.parametrize('name', ['truncated.ipa', 'zip64.ipa'])
+def test_malformed_ipa_raises_metadata_error(server, extractor, name):
+    with pytest.raises(IPAMetadataError):
+        extractor.extract(f"{server}/{name}")
+
+def test_extract_many_skips_only_the_bad_ipas(server, extractor):
+    urls = [f"{server}/{name}" for name in ('valid.ipa', 'truncated.ipa', 'zip64.ipa')]
+    results = extractor.extract_many((url, None) for url in urls)
+    assert results[urls[0]]['bundleID'] == 'com.example.app'
+    assert 'error' in results[urls[1]] and 'error' in results[urls[2]]
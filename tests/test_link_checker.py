@@ -0,0 +1,62 @@
+import socket
+import time
+import pytest
+import requests
+from link_checker import LinkChecker
+from request_scheduler import RequestScheduler
+from url_cache import URLCache
+
+SIZE = 12345
+
+@pytest.fixture
+def assets(tmp_path):
+    directory = tmp_path / 'assets'
+    directory.mkdir()
+    (directory / 'app.ipa').write_bytes(b'\0' * SIZE)
+    return directory
+
+def make_checker(cache=None):
+    scheduler = RequestScheduler(requests.Session(), [], max_retries=0, name="LinkScheduler")
+    return LinkChecker(scheduler, cache or URLCache(None), workers=4)
+
+def closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/app.ipa"
+
+def test_head_reports_content_length(assets, static_server):
+    url = f"{static_server(assets)}/app.ipa"
+    assert make_checker().check([url])[url] == {'status': 200, 'size': SIZE}
+
+@pytest.mark.parametrize('head_status', [403, 405])
+def test_rejected_head_falls_back_to_ranged_get(assets, static_server, head_status):
+    url = f"{static_server(assets, head_status=head_status)}/app.ipa"
+    # The one-byte range reports the full size in its Content-Range total
+    assert make_checker().check([url])[url] == {'status': 206, 'size': SIZE}
+
+def test_ranged_get_ignored_by_server_uses_content_length(assets, static_server):
+    url = f"{static_server(assets, ranges=False, head_status=405)}/app.ipa"
+    assert make_checker().check([url])[url] == {'status': 200, 'size': SIZE}
+
+def test_dead_and_unreachable_links_are_told_apart(assets, static_server):
+    dead, unreachable = f"{static_server(assets)}/missing.ipa", closed_port_url()
+    cache = URLCache(None)
+    checker = make_checker(cache)
+    results = checker.check([dead, unreachable])
+    assert results[dead] == {'status': 404, 'size': None} and checker.is_dead(results[dead])
+    assert results[unreachable]['status'] is None and 'error' in results[unreachable]
+    assert not checker.is_dead(results[unreachable])
+    # Only definite answers are cached; the unreachable host is tried again next run
+    assert cache.get(dead) is not None and cache.get(unreachable) is None
+
+def test_results_are_cached_until_the_ttl_expires(assets, static_server, tmp_path, monkeypatch):
+    url = f"{static_server(assets)}/app.ipa"
+    cache_path = str(tmp_path / 'links.json')
+    assert make_checker(URLCache(cache_path, ttl=60)).check([url])[url]['status'] == 200
+    (assets / 'app.ipa').unlink()
+    # Within the TTL the saved result is trusted without asking the server
+    assert make_checker(URLCache(cache_path, ttl=60)).check([url])[url]['status'] == 200
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    assert make_checker(URLCache(cache_path, ttl=60)).check([url])[url]['status'] == 404
@@ -0,0 +1,89 @@
+import json
+import os
+import pytest
+from PIL import Image
+from manage_assets import AssetManager
+from metrics import METRICS
+
+def make_app(root, name: str):
+    app_dir = root / name
+    (app_dir / 'screenshots').mkdir(parents=True)
+    (app_dir / 'app.json').write_text(json.dumps({'name': name, 'bundleID': f'com.example.{name}'}))
+    Image.new('RGBA', (300, 300), (200, 40, 40, 255)).save(app_dir / 'icon.png')
+    for i in range(2):
+        Image.new('RGB', (120, 240), (i * 60, 90, 160)).save(app_dir / 'screenshots' / f'shot{i}.jpg')
+    return app_dir
+
+def run_counters(apps_root, workers: int):
+    METRICS.reset()
+    # Counters left by an earlier stage, as in the pipeline, must not be counted twice
+    METRICS.incr('http_requests', 7)
+    AssetManager(str(apps_root), workers=workers).manage_icons()
+    return dict(METRICS.counters)
+
+def test_pooled_run_reports_same_counters_as_serial(tmp_path_factory):
+    serial_root, pooled_root = tmp_path_factory.mktemp('serial'), tmp_path_factory.mktemp('pooled')
+    for root in (serial_root, pooled_root):
+        for name in ('Alpha', 'Beta', 'Gamma'):
+            make_app(root, name)
+    serial = run_counters(serial_root, workers=1)
+    pooled = run_counters(pooled_root, workers=3)
+    assert serial['http_requests'] == 7
+    assert pooled == serial
+
+def test_in_place_rgba_screenshot_is_normalized_even_if_not_smaller(tmp_path):
+    app_dir = make_app(tmp_path, 'Alpha')
+    for shot in (app_dir / 'screenshots').iterdir():
+        shot.unlink()
+    Image.new('RGBA', (120, 240), (10, 20, 30, 128)).save(app_dir / 'screenshots' / 'IMG_1.png')
+    manager = AssetManager(str(tmp_path), workers=1)
+    encode = manager._encode_png
+    # Make the RGB re-encode larger than the source, which used to keep the RGBA bytes
+    manager._encode_png = lambda img, optimize=None: encode(img, optimize) + b'\0' * 100000
+    manager.manage_icons()
+    with Image.open(app_dir / 'screenshots' / 'IMG_1.png') as img:
+        assert img.mode == 'RGB'
+
+def icon_app(tmp_path, **images):
+    app_dir = tmp_path / 'Alpha'
+    app_dir.mkdir(exist_ok=True)
+    (app_dir / 'app.json').write_text(json.dumps({'name': 'Alpha', 'bundleID': 'com.example.Alpha'}))
+    for filename, image in images.items():
+        image.save(app_dir / filename.replace('_', '.'))
+    AssetManager(str(tmp_path), workers=1).manage_icons()
+    return app_dir, json.loads((app_dir / 'app.json').read_text())
+
+def test_small_icon_is_never_upscaled(tmp_path):
+    app_dir, config = icon_app(tmp_path, icon_png=Image.new('RGB', (32, 32), 'red'))
+    assert config['icon'].endswith('/icon.png') and config['icons'] == {}
+    assert not (app_dir / 'icons').exists()
+
+def test_non_square_icon_is_cropped_not_distorted(tmp_path):
+    master = Image.new('RGB', (300, 200), 'blue')
+    master.paste('red', (0, 0, 50, 200))
+    app_dir, config = icon_app(tmp_path, icon_png=master)
+    assert sorted(config['icons']) == ['128', '64']
+    with Image.open(app_dir / 'icon.png') as img:
+        assert img.size == (200, 200)
+        # The red band on the left edge was cropped away
+        assert img.getpixel((0, 100)) == (0, 0, 255)
+    with Image.open(app_dir / 'icons' / 'icon-128.png') as img:
+        assert img.size == (128, 128)
+
+def test_corrupt_icon_png_falls_back_to_other_icons(tmp_path):
+    app_dir = tmp_path / 'Alpha'
+    app_dir.mkdir()
+    (app_dir / 'icon.png').write_bytes(b'not a png')
+    app_dir, config = icon_app(tmp_path, icon_jpg=Image.new('RGB', (128, 128), 'green'))
+    assert not (app_dir / 'icon.jpg').exists()
+    with Image.open(app_dir / 'icon.png') as img:
+        assert img.size == (128, 128)
+    assert sorted(config['icons']) == ['128', '64']
+
+@pytest.mark.parametrize('workers', [0, -1, True, 2.5])
+def test_invalid_worker_counts_are_rejected_up_front(tmp_path, workers):
+    with pytest.raises(ValueError):
+        AssetManager(str(tmp_path), workers=workers)
+
+def test_unset_worker_count_uses_every_cpu(tmp_path):
+    assert AssetManager(str(tmp_path)).workers == (os.cpu_count() or 1)
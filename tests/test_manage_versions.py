@@ -0,0 +1,175 @@
+import glob
+import json
+import os
+import socket
+import pytest
+from manage_versions import VersionManager
+from mock_github import MockGitHub
+from release_rules import ReleaseRules
+from request_scheduler import RequestScheduler
+
+APPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Apps')
+
+@pytest.fixture
+def manager():
+    return VersionManager(APPS_DIR, keep_versions=1000, tokens=[])
+
+@pytest.mark.parametrize('config', sorted(glob.glob(os.path.join(APPS_DIR, '*', 'app.json'))),
+                         ids=lambda path: os.path.basename(os.path.dirname(path)))
+def test_sort_keeps_catalog_order(manager, config):
+    with open(config) as f:
+        versions = json.load(f).get('versions', [])
+    assert manager._sort_versions(versions, ReleaseRules()) == versions
+
+def test_sort_by_date_ignores_version_numbers(manager):
+    versions = [{'version': '1.3.0', 'date': '2024-11-17'}, {'version': 'nightly', 'date': '2025-06-01'},
+                {'version': '0.0.1', 'date': '2025-05-15'}]
+    assert [v['version'] for v in manager._sort_versions(versions, ReleaseRules())] == ['nightly', '0.0.1', '1.3.0']
+
+def test_sort_by_version_when_rules_opt_in(manager):
+    versions = [{'version': '1.0beta', 'date': '2025-03-01'}, {'version': '1.0', 'date': '2025-01-01'},
+                {'version': '1.10', 'date': '2024-01-01'}, {'version': '1.9', 'date': '2025-02-01'}]
+    rules = ReleaseRules({'sort_by_version': True})
+    assert [v['version'] for v in manager._sort_versions(versions, rules)] == ['1.10', '1.9', '1.0', '1.0beta']
+
+def test_sort_trims_to_keep(manager):
+    manager.keep_versions = 2
+    versions = [{'version': str(i), 'date': f'2025-01-0{i}'} for i in range(1, 6)]
+    assert [v['version'] for v in manager._sort_versions(versions, ReleaseRules())] == ['5', '4']
+
+class DraftMockGitHub(MockGitHub):
+    """Lists an unpublished draft first, as GitHub does for authenticated owners."""
+
+    def releases(self, owner, repo):
+        draft = {'id': 0, 'tag_name': 'v9.9.9', 'published_at': None, 'assets': [
+            {'name': f"{repo}.ipa", 'size': 1, 'browser_download_url': f"https://github.com/{owner}/{repo}/draft.ipa"}]}
+        return [draft] + super().releases(owner, repo)
+
+@pytest.fixture
+def mock_api():
+    # More releases than one REST page holds, so pagination has to continue past the draft
+    mock = DraftMockGitHub(releases_per_repo=150).start()
+    yield mock
+    mock.stop()
+
+def make_app(root, watermark=None):
+    app_dir = root / 'Apps' / 'Alpha'
+    app_dir.mkdir(parents=True)
+    repo = 'https://github.com/owner/alpha'
+    (app_dir / 'app.json').write_text(json.dumps({'name': 'Alpha', 'bundleID': 'com.example.alpha',
+                                                  'gitURLs': [repo], 'versions': []}))
+    (app_dir / '.rules.yaml').write_text("strip_v_prefix: true\n")
+    if watermark:
+        (app_dir / '.watermarks.json').write_text(json.dumps({repo: watermark}))
+    return app_dir
+
+def run_update(root, mock, **kwargs):
+    manager = VersionManager(str(root / 'Apps'), keep_versions=1000, api_url=mock.url, tokens=['token'], **kwargs)
+    manager.manage('update')
+    with open(root / 'Apps' / 'Alpha' / 'app.json') as f:
+        return [v['version'] for v in json.load(f)['versions']]
+
+@pytest.mark.parametrize('backend', ['rest', 'graphql'])
+def test_draft_does_not_stop_pagination_at_watermark(tmp_path, mock_api, backend):
+    # Releases 1..20 were seen on an earlier run
+    watermark = mock_api.releases('owner', 'alpha')[-20]['published_at']
+    make_app(tmp_path, watermark)
+    versions = run_update(tmp_path, mock_api, backend=backend)
+    assert versions == [f"1.{n}.0" for n in range(150, 20, -1)]
+
+def test_full_resync_does_not_duplicate_known_releases(tmp_path, mock_api):
+    make_app(tmp_path)
+    first = run_update(tmp_path, mock_api, full_resync=True)
+    assert len(first) == 150
+    assert run_update(tmp_path, mock_api, full_resync=True) == first
+
+def test_unchanged_pages_are_revalidated_with_etags(tmp_path, mock_api):
+    make_app(tmp_path)
+    cache_dir = str(tmp_path / '.cache' / 'http')
+    first = run_update(tmp_path, mock_api, cache_dir=cache_dir, full_resync=True)
+    assert len(first) == 150 and mock_api.stats['not_modified'] == 0
+    requests_before = mock_api.stats['requests']
+    assert run_update(tmp_path, mock_api, cache_dir=cache_dir, full_resync=True) == first
+    # Both pages came back 304 from conditional requests, served from the on-disk cache
+    assert mock_api.stats['not_modified'] == 2
+    assert mock_api.stats['requests'] - requests_before == 2
+
+def rederive(root, keep, monkeypatch):
+    manager = VersionManager(str(root / 'Apps'), keep_versions=keep, tokens=[],
+                             history_db=str(root / '.cache' / 'releases.db'))
+    # Re-deriving works from the stored history alone
+    monkeypatch.setattr(manager.session, 'request', lambda *args, **kwargs: pytest.fail('network access'))
+    try:
+        manager.manage('rederive')
+    finally:
+        manager.history.close()
+    with open(root / 'Apps' / 'Alpha' / 'app.json') as f:
+        return json.load(f)['versions']
+
+def test_rederive_applies_new_rules_and_keep_offline(tmp_path, mock_api, monkeypatch):
+    app_dir = make_app(tmp_path)
+    run_update(tmp_path, mock_api, full_resync=True, history_db=str(tmp_path / '.cache' / 'releases.db'))
+    config = json.loads((app_dir / 'app.json').read_text())
+    latest = config['versions'][0]
+    # Fields later actions add to a version, and a version added by hand that no release has
+    latest.update({'sha256': 'ab' * 32, 'ipa': {'minOSVersion': '15.0'}})
+    manual = {'version': 'manual', 'date': '2025-01-01', 'size': 1, 'url': 'https://example.com/manual.ipa'}
+    config['versions'].append(manual)
+    (app_dir / 'app.json').write_text(json.dumps(config))
+    (app_dir / '.rules.yaml').write_text("exclude_patterns: ['1.149.']\n")
+    requests_before = mock_api.stats['requests']
+
+    versions = rederive(tmp_path, 5, monkeypatch)
+    assert [v['version'] for v in versions] == ['manual', 'v1.150.0', 'v1.148.0', 'v1.147.0', 'v1.146.0']
+    assert versions[0] == manual
+    assert versions[1] == {**latest, 'version': 'v1.150.0'}
+    assert mock_api.stats['requests'] == requests_before
+
+def test_rederive_without_history_points_at_full_resync(tmp_path, monkeypatch, caplog):
+    make_app(tmp_path)
+    assert rederive(tmp_path, 10, monkeypatch) == []
+    assert '--full-resync' in caplog.text
+
+def test_repo_shared_by_two_apps_is_fetched_once(tmp_path, mock_api):
+    releases = mock_api.releases('owner', 'alpha')
+    # Alpha only misses the newest 30 releases; Beta misses 120, which takes a second page
+    watermarks = {'Alpha': releases[31]['published_at'], 'Beta': releases[121]['published_at']}
+    for name, repo in (('Alpha', 'https://github.com/owner/alpha'), ('Beta', 'https://github.com/Owner/Alpha')):
+        app_dir = tmp_path / 'Apps' / name
+        app_dir.mkdir(parents=True)
+        (app_dir / 'app.json').write_text(json.dumps({'name': name, 'bundleID': f'com.example.{name.lower()}',
+                                                      'gitURLs': [repo], 'versions': []}))
+        (app_dir / '.rules.yaml').write_text("strip_v_prefix: true\n")
+        (app_dir / '.watermarks.json').write_text(json.dumps({repo: watermarks[name]}))
+
+    manager = VersionManager(str(tmp_path / 'Apps'), keep_versions=1000, api_url=mock_api.url, tokens=['token'])
+    manager.manage('update')
+    # One paginated fetch, back to the older watermark, serves both apps
+    assert mock_api.stats['requests'] == 2
+    for name, newest_missed in (('Alpha', 30), ('Beta', 120)):
+        versions = json.loads((tmp_path / 'Apps' / name / 'app.json').read_text())['versions']
+        assert [v['version'] for v in versions] == [f"1.{n}.0" for n in range(150, 150 - newest_missed, -1)]
+
+@pytest.mark.parametrize('drop_dead', [False, True], ids=['flag', 'drop'])
+def test_check_links_flags_or_drops_only_dead_versions(tmp_path, static_server, monkeypatch, drop_dead):
+    assets = tmp_path / 'assets'
+    assets.mkdir()
+    (assets / 'live.ipa').write_bytes(b'\0' * 2048)
+    base = static_server(assets)
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        unreachable = f"http://127.0.0.1:{sock.getsockname()[1]}/gone.ipa"
+    # Connection errors are retried with backoff; skip the sleeping
+    monkeypatch.setattr(RequestScheduler, '_backoff', lambda self, *args: None)
+    app_dir = make_app(tmp_path)
+    config = json.loads((app_dir / 'app.json').read_text())
+    config['versions'] = [{'version': '3.0', 'date': '2025-03-01', 'size': 1, 'url': f"{base}/live.ipa"},
+                          {'version': '2.0', 'date': '2025-02-01', 'size': 1, 'url': f"{base}/dead.ipa"},
+                          {'version': '1.0', 'date': '2025-01-01', 'size': 1, 'url': unreachable}]
+    (app_dir / 'app.json').write_text(json.dumps(config))
+
+    VersionManager(str(tmp_path / 'Apps'), tokens=[], drop_dead=drop_dead).manage('check')
+    versions = json.loads((app_dir / 'app.json').read_text())['versions']
+    # A wrong size is corrected; an unreachable host is never mistaken for a dead download
+    expected = [('3.0', 2048), ('1.0', 1)] if drop_dead else [('3.0', 2048), ('2.0', 1), ('1.0', 1)]
+    assert [(v['version'], v['size']) for v in versions] == expected
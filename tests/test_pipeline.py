@@ -0,0 +1,29 @@
+import json
+import pytest
+from pipeline import Pipeline
+
+REPO_INFO = {'name': 'Test Repo', 'iconURL': 'https://example.com/icon.png'}
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'repo-info.json').write_text(json.dumps(REPO_INFO))
+    app_dir = tmp_path / 'Apps' / 'Alpha'
+    app_dir.mkdir(parents=True)
+    (app_dir / 'app.json').write_text(json.dumps({'name': 'Alpha', 'bundleID': 'com.example.alpha', 'versions': []}))
+    return tmp_path
+
+def test_compile_alone_is_not_skipped(root):
+    Pipeline(str(root), stages=['compile']).run()
+    assert (root / 'altstore.json').is_file()
+
+def test_compile_skipped_when_upstream_changed_nothing(root):
+    changed = Pipeline(str(root), stages=['assets', 'compile'], asset_workers=1).run()
+    assert changed == {'assets': set()}
+    assert not (root / 'altstore.json').exists()
+
+def test_compile_runs_for_upstream_changes(root):
+    from PIL import Image
+    Image.new('RGB', (128, 128), 'red').save(root / 'Apps' / 'Alpha' / 'icon.png')
+    changed = Pipeline(str(root), stages=['assets', 'compile'], asset_workers=1).run()
+    assert changed['assets'] == {'Alpha'}
+    assert json.loads((root / 'altstore.json').read_text())['apps'][0]['iconURL'].endswith('icon-128.png')
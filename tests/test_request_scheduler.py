@@ -0,0 +1,53 @@
+import time
+import pytest
+from requests.exceptions import RequestException
+from request_scheduler import RequestScheduler
+
+class FakeResponse:
+    def __init__(self, status_code: int, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = b''
+        self.text = ''
+        self.url = 'https://example.com/asset.ipa'
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def request(self, method, url, **kwargs):
+        return self.responses.pop(0)
+
+def test_retried_streamed_responses_are_closed():
+    responses = [FakeResponse(503), FakeResponse(502), FakeResponse(200)]
+    scheduler = RequestScheduler(FakeSession(responses), [], backoff_base=0.0)
+    response = scheduler.request('GET', 'https://example.com/asset.ipa', stream=True)
+    assert response is responses[2] and not response.closed
+    assert responses[0].closed and responses[1].closed
+
+def test_last_attempt_is_returned_open():
+    responses = [FakeResponse(503), FakeResponse(503)]
+    scheduler = RequestScheduler(FakeSession(responses), [], max_retries=1, backoff_base=0.0)
+    response = scheduler.request('GET', 'https://example.com/asset.ipa', stream=True)
+    assert response is responses[1] and not response.closed
+
+def test_retry_after_beyond_max_wait_raises_instead_of_sleeping(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+    responses = [FakeResponse(403, {'Retry-After': '3600'}), FakeResponse(200)]
+    scheduler = RequestScheduler(FakeSession(responses), [], max_wait=900.0)
+    with pytest.raises(RequestException, match='exceeds max_wait'):
+        scheduler.get('https://api.github.com/repos/o/r/releases')
+    assert sleeps == []
+
+def test_retry_after_within_max_wait_is_honored(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+    responses = [FakeResponse(403, {'Retry-After': '30'}), FakeResponse(200)]
+    scheduler = RequestScheduler(FakeSession(responses), [], max_wait=900.0)
+    assert scheduler.get('https://api.github.com/repos/o/r/releases') is responses[1]
+    assert sleeps == [30.0]